@@ -5,40 +5,108 @@ Runs the backup service in a separate process
 
 import asyncio
 import logging
+import queue
 import signal
 import sys
 import os
-from telegram_backup import create_backup_manager
-
-# Configure logging specifically for the service
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - SERVICE - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('telegram_backup.log'),
-        logging.StreamHandler()
-    ]
-)
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
+from telegram_backup import create_backup_manager, run_event_loop
+
 logger = logging.getLogger(__name__)
 
+SERVICE_PID_FILE = "service.pid"
+
+def configure_logging() -> QueueListener:
+    """Configure service logging; file/console writes happen on a background thread"""
+    log_queue = queue.SimpleQueue()
+    formatter = logging.Formatter('%(asctime)s - SERVICE - %(levelname)s - %(message)s')
+
+    file_handler = logging.FileHandler('telegram_backup.log')
+    stream_handler = logging.StreamHandler()
+    for handler in (file_handler, stream_handler):
+        handler.setFormatter(formatter)
+
+    # QueueHandler.prepare() still merges msg/args (and any traceback) on the calling
+    # thread; the listener's handlers add the timestamp/level layout and do the I/O
+    queue_handler = QueueHandler(log_queue)
+
+    # force=True: importing telegram_backup already configured the root logger.
+    # format='%(message)s' keeps basicConfig from prefixing "LEVEL:name:" in prepare()
+    logging.basicConfig(level=logging.INFO, format='%(message)s', handlers=[queue_handler], force=True)
+
+    listener = QueueListener(log_queue, file_handler, stream_handler, respect_handler_level=True)
+    listener.start()
+    return listener
+
 async def main():
     logger.info("Starting Backup Service...")
 
     # Write PID file
-    with open("service.pid", "w") as f:
+    with open(SERVICE_PID_FILE, "w") as f:
         f.write(str(os.getpid()))
 
+    manager = None
     try:
         manager = create_backup_manager()
         await manager.run_backup_service()
     except Exception as e:
-        logger.error(f"Service crashed: {e}")
+        logger.error("Service crashed: %s", e)
     finally:
+        # Persist buffered state updates before exiting
+        if manager is not None:
+            manager.db.flush()
         # Cleanup PID file
-        if os.path.exists("service.pid"):
-            os.remove("service.pid")
+        try:
+            os.remove(SERVICE_PID_FILE)
+        except FileNotFoundError:
+            pass
         logger.info("Service Stopped")
 
+async def _poll_for_exit(pid: int, timeout: Optional[float], interval: float = 0.1) -> bool:
+    loop = asyncio.get_running_loop()
+    deadline = None if timeout is None else loop.time() + timeout
+    while True:
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return True
+        except PermissionError:
+            pass  # process exists but belongs to another user
+        if deadline is not None and loop.time() >= deadline:
+            return False
+        await asyncio.sleep(interval)
+
+async def wait_for_service_exit(pid: int, timeout: Optional[float] = None) -> bool:
+    """Wait for the service process to exit; returns False on timeout.
+
+    Uses a pidfd (Linux 5.3+, Python 3.9+), which becomes readable when the
+    process exits, and falls back to polling the PID elsewhere.
+    """
+    try:
+        fd = os.pidfd_open(pid)
+    except ProcessLookupError:
+        return True
+    except (AttributeError, OSError):
+        return await _poll_for_exit(pid, timeout)
+
+    loop = asyncio.get_running_loop()
+    exited = loop.create_future()
+
+    def _on_exit():
+        if not exited.done():
+            exited.set_result(True)
+
+    loop.add_reader(fd, _on_exit)
+    try:
+        await asyncio.wait_for(exited, timeout)
+        return True
+    except asyncio.TimeoutError:
+        return False
+    finally:
+        loop.remove_reader(fd)
+        os.close(fd)
+
 def handle_signal(sig, frame):
     logger.info("Received stop signal")
     # Clean exit handled by run_backup_service's run_until_disconnected logic mostly,
@@ -46,10 +114,13 @@ def handle_signal(sig, frame):
     sys.exit(0)
 
 if __name__ == "__main__":
+    listener = configure_logging()
     signal.signal(signal.SIGINT, handle_signal)
     signal.signal(signal.SIGTERM, handle_signal)
 
     try:
-        asyncio.run(main())
+        run_event_loop(main())
     except KeyboardInterrupt:
         pass
+    finally:
+        listener.stop()
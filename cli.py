@@ -4,12 +4,9 @@ Telegram Backup CLI - Interface de Linha de Comando
 Interface moderna com Rich para gerenciamento do sistema de backup
 """
 
-import os
 import sys
 import asyncio
-import json
-from datetime import datetime
-from pathlib import Path
+from itertools import islice
 from typing import Dict
 
 import click
@@ -19,32 +16,42 @@ from rich.table import Table
 from rich.prompt import Prompt, Confirm
 from rich.panel import Panel
 from rich.text import Text
-from rich.columns import Columns
-from rich.live import Live
-from rich.spinner import Spinner
-from rich.progress import Progress, SpinnerColumn, TextColumn
 
-# Importar backend
-from telegram_backup import (
-    TelegramBackupManager, 
-    create_backup_manager, 
-    run_backup
-)
-from models import MessageType
+from models import FILTER_LABELS
+
+# O backend (Telethon) e os widgets Rich menos usados são importados sob
+# demanda, para que `--help` e comandos simples não paguem esse custo.
 
 # Configuração
 load_dotenv()
 console = Console()
 
+MENU_OPTIONS = (
+    "[bold cyan]Opções:[/bold cyan]",
+    "[1] 📊 Ver configuração",
+    "[2] ➕ Adicionar rota",
+    "[3] ❌ Remover rota",
+    "[4] ⚙️ Configurar filtros",
+    "[5] 🚀 Iniciar backup",
+    "[6] 💾 Salvar configuração",
+    "[0] ❌ Sair",
+)
+MENU_CHOICES = ["0", "1", "2", "3", "4", "5", "6"]
+GLYPH = {True: "✅", False: "❌"}
+
 class RichTelegramCLI:
     """Interface CLI com Rich para gerenciamento do backup"""
     
     def __init__(self):
         self.manager = None
+        self._welcome_panel = self._build_welcome_panel()
+        self._menu_options = Text.from_markup("\n".join(MENU_OPTIONS))
         self.setup_manager()
     
     def setup_manager(self):
         """Configura o gerenciador de backup"""
+        from telegram_backup import TelegramBackupManager
+        
         try:
             self.manager = TelegramBackupManager()
         except ValueError as e:
@@ -55,29 +62,57 @@ class RichTelegramCLI:
             console.print(f"[red]Erro ao inicializar: {e}[/red]")
             sys.exit(1)
     
-    def show_welcome(self):
-        """Mostra tela de boas-vindas"""
+    @staticmethod
+    def _build_welcome_panel() -> Panel:
+        """Monta o painel de boas-vindas (estático, construído uma vez)"""
         welcome_text = Text()
         welcome_text.append("🚀 ", style="bold green")
         welcome_text.append("Telegram Backup Manager", style="bold cyan")
         welcome_text.append(" v2.0\n", style="dim")
         welcome_text.append("Sistema profissional de backup para Telegram", style="white")
         
-        panel = Panel(
+        return Panel(
             welcome_text,
             title="[bold blue]Bem-vindo[/bold blue]",
             border_style="blue",
             padding=(1, 2)
         )
+    
+    @staticmethod
+    def _routes_table(routes: Dict, title: str) -> Table:
+        """Monta a tabela de rotas a partir dos dados"""
+        table = Table(title=title)
+        table.add_column("#", justify="right", style="cyan")
+        table.add_column("Origem", style="green")
+        table.add_column("Destino", style="blue")
+        table.add_column("Status", justify="center")
+        
+        for idx, (source, dest) in enumerate(routes.items(), 1):
+            table.add_row(str(idx), str(source), str(dest), "✅ Ativa")
         
-        console.print(panel)
+        return table
+    
+    def show_welcome(self):
+        """Mostra tela de boas-vindas"""
+        console.print(self._welcome_panel)
+        console.print()
+    
+    def show_menu(self):
+        """Limpa a tela e desenha cabeçalho + opções em uma única passada"""
+        console.clear()
+        self.show_welcome()
+        console.print(self._menu_options)
         console.print()
     
     def show_config(self):
         """Mostra configuração atual"""
+        from rich.columns import Columns
+        
         try:
-            routes, filters = self.manager.load_config()
+            config = self.manager.load_config()
+            routes, filters = config.routes, config.filters
             stats = self.manager.get_stats()
+            active_filters = sum(1 for _, value in filters if value)
             
             # Título
             console.print("[bold cyan]📋 Configuração Atual[/bold cyan]")
@@ -85,9 +120,9 @@ class RichTelegramCLI:
             
             # Estatísticas
             stats_columns = Columns([
-                f"[green]✅ Rotas:[/green] {stats['total_routes']}",
-                f"[blue]🎯 Filtros:[/blue] {stats['active_filters']}",
-                f"[yellow]📊 Mensagens:[/yellow] {stats['processed_messages']}"
+                f"[green]✅ Rotas:[/green] {stats.total_routes}",
+                f"[blue]🎯 Filtros:[/blue] {active_filters}",
+                f"[yellow]📊 Mensagens:[/yellow] {stats.processed_messages}"
             ])
             
             console.print(stats_columns)
@@ -95,17 +130,7 @@ class RichTelegramCLI:
             
             # Tabela de rotas
             if routes:
-                table = Table(title="Rotas de Backup")
-                table.add_column("#", justify="right", style="cyan")
-                table.add_column("Origem", style="green")
-                table.add_column("Destino", style="blue")
-                table.add_column("Status", justify="center")
-                
-                for idx, (source, dest) in enumerate(routes.items(), 1):
-                    status = "✅ Ativa" if source in routes else "❌ Inativa"
-                    table.add_row(str(idx), str(source), str(dest), status)
-                
-                console.print(table)
+                console.print(self._routes_table(routes, "Rotas de Backup"))
             else:
                 console.print("[yellow]⚠️ Nenhuma rota configurada[/yellow]")
             
@@ -113,9 +138,8 @@ class RichTelegramCLI:
             
             # Filtros
             console.print("[bold cyan]🎯 Filtros:[/bold cyan]")
-            for key, value in filters.items():
-                status = "✅" if value else "❌"
-                console.print(f"  {status} {key.replace('_', ' ').title()}")
+            for key, value in filters:
+                console.print("  " + GLYPH[value] + " " + FILTER_LABELS[key])
             
             console.print()
         
@@ -125,23 +149,13 @@ class RichTelegramCLI:
     def show_routes_table(self, routes: Dict = None):
         """Mostra tabela de rotas"""
         if routes is None:
-            routes, _ = self.manager.load_config()
+            routes = self.manager.load_config().routes
         
         if not routes:
             console.print("[yellow]Nenhuma rota configurada[/yellow]")
             return
         
-        table = Table(title="Rotas de Backup (origem → destino)")
-        table.add_column("#", justify="right", style="cyan")
-        table.add_column("Origem", style="green")
-        table.add_column("Destino", style="blue")
-        table.add_column("Status", justify="center")
-        
-        for idx, (source, dest) in enumerate(routes.items(), 1):
-            status = "✅ Ativa"
-            table.add_row(str(idx), str(source), str(dest), status)
-        
-        console.print(table)
+        console.print(self._routes_table(routes, "Rotas de Backup (origem → destino)"))
     
     def add_route_interactive(self):
         """Interface interativa para adicionar rota"""
@@ -172,7 +186,7 @@ class RichTelegramCLI:
     
     def remove_route_interactive(self):
         """Interface interativa para remover rota"""
-        routes, _ = self.manager.load_config()
+        routes = self.manager.load_config().routes
         
         if not routes:
             console.print("[yellow]Nenhuma rota para remover[/yellow]")
@@ -194,9 +208,8 @@ class RichTelegramCLI:
         else:
             try:
                 idx = int(choice)
-                route_keys = list(routes.keys())
-                if 1 <= idx <= len(route_keys):
-                    source = route_keys[idx - 1]
+                if 1 <= idx <= len(routes):
+                    source = next(islice(routes, idx - 1, idx))
                     dest = routes[source]
                     
                     if Confirm.ask(f"Remover rota: {source} → {dest}?"):
@@ -213,23 +226,22 @@ class RichTelegramCLI:
     
     def configure_filters_interactive(self):
         """Interface interativa para configurar filtros"""
-        _, current_filters = self.manager.load_config()
+        current_filters = self.manager.load_config().filters
         
         console.print("[bold cyan]⚙️ Configurar Filtros[/bold cyan]")
         console.print()
         
         # Configurações atuais
         console.print("[dim]Configurações atuais:[/dim]")
-        for key, value in current_filters.items():
-            status = "✅" if value else "❌"
-            console.print(f"  {status} {key.replace('_', ' ').title()}")
+        for key, value in current_filters:
+            console.print("  " + GLYPH[value] + " " + FILTER_LABELS[key])
         
         console.print()
         
         # Novas configurações
-        media_only = Confirm.ask("Apenas mídia?", default=current_filters.get("media_only", False))
-        photos = Confirm.ask("Incluir fotos?", default=current_filters.get("photos", True))
-        videos = Confirm.ask("Incluir vídeos?", default=current_filters.get("videos", True))
+        media_only = Confirm.ask("Apenas mídia?", default=current_filters.media_only)
+        photos = Confirm.ask("Incluir fotos?", default=current_filters.photos)
+        videos = Confirm.ask("Incluir vídeos?", default=current_filters.videos)
         
         if Confirm.ask("\nSalvar configuração?"):
             with console.status("[bold green]Atualizando filtros..."):
@@ -246,6 +258,9 @@ class RichTelegramCLI:
     
     async def run_backup_service(self):
         """Executa o serviço de backup com interface Rich"""
+        from rich.live import Live
+        from rich.spinner import Spinner
+        
         try:
             console.print("[bold green]🚀 Iniciando Serviço de Backup[/bold green]")
             
@@ -262,24 +277,28 @@ class RichTelegramCLI:
             console.print(f"[blue]Usuário:[/blue] {self.manager.get_entity_display_name(me)}")
             console.print()
             
-            # Iniciar backup
+            # Iniciar backup (spinner só durante a fase de inicialização,
+            # para não acordar o loop a cada refresh enquanto ocioso)
             with Live(
                 Panel(
                     Spinner("dots", text="Iniciando backup..."),
                     title="[bold yellow]Backup em Progresso[/bold yellow]"
                 ),
-                refresh_per_second=4
+                refresh_per_second=4,
+                transient=True
             ):
-                if await self.manager.start_real_time_backup():
-                    console.print("[green]✅ Backup iniciado![/green]")
-                    console.print("[dim]Aguardando mensagens... (Ctrl+C para parar)[/dim]")
-                    
-                    try:
-                        await self.manager.client.run_until_disconnected()
-                    except KeyboardInterrupt:
-                        console.print("\n[yellow]⚠️ Serviço interrompido pelo usuário[/yellow]")
-                else:
-                    console.print("[red]❌ Erro ao iniciar backup[/red]")
+                started = await self.manager.start_real_time_backup()
+            
+            if started:
+                console.print("[green]✅ Backup iniciado![/green]")
+                console.print("[dim]Aguardando mensagens... (Ctrl+C para parar)[/dim]")
+                
+                try:
+                    await self.manager.client.run_until_disconnected()
+                except KeyboardInterrupt:
+                    console.print("\n[yellow]⚠️ Serviço interrompido pelo usuário[/yellow]")
+            else:
+                console.print("[red]❌ Erro ao iniciar backup[/red]")
         
         except Exception as e:
             console.print(f"[red]❌ Erro no serviço: {e}[/red]")
@@ -290,30 +309,28 @@ class RichTelegramCLI:
 # Comandos Click
 @click.group()
 @click.version_option(version="2.0.0")
-def cli():
+@click.pass_context
+def cli(ctx):
     """Telegram Backup CLI - Interface de linha de comando moderna"""
-    pass
+    ctx.ensure_object(dict)
+
+def _get_cli(ctx: click.Context) -> RichTelegramCLI:
+    """Retorna a interface compartilhada do contexto (criada uma única vez)"""
+    obj = ctx.ensure_object(dict)
+    if "cli" not in obj:
+        obj["cli"] = RichTelegramCLI()
+    return obj["cli"]
 
 @cli.command()
-def menu():
+@click.pass_context
+def menu(ctx):
     """Interface interativa completa com menu Rich"""
-    cli_interface = RichTelegramCLI()
+    cli_interface = _get_cli(ctx)
     
     while True:
-        cli_interface.show_welcome()
-        
-        # Menu principal
-        console.print("[bold cyan]Opções:[/bold cyan]")
-        console.print("[1] 📊 Ver configuração")
-        console.print("[2] ➕ Adicionar rota")
-        console.print("[3] ❌ Remover rota")
-        console.print("[4] ⚙️ Configurar filtros")
-        console.print("[5] 🚀 Iniciar backup")
-        console.print("[6] 💾 Salvar configuração")
-        console.print("[0] ❌ Sair")
-        console.print()
+        cli_interface.show_menu()
         
-        choice = Prompt.ask("Escolha", choices=["0", "1", "2", "3", "4", "5", "6"], default="1")
+        choice = Prompt.ask("Escolha", choices=MENU_CHOICES, default="1")
         
         if choice == "1":
             cli_interface.show_config()
@@ -334,29 +351,35 @@ def menu():
             console.print("[yellow]Saindo...[/yellow]")
             break
         
-        console.print("\n" + "="*50 + "\n")
+        # Mantém o resultado visível até a próxima limpeza de tela
+        Prompt.ask("[dim]Enter para continuar[/dim]", default="", show_default=False)
 
 @cli.command()
-def show_config():
+@click.pass_context
+def show_config(ctx):
     """Mostra configuração atual"""
-    cli = RichTelegramCLI()
+    cli = _get_cli(ctx)
     cli.show_config()
 
 @cli.command()
-def add_route():
+@click.pass_context
+def add_route(ctx):
     """Adicionar rota interativamente"""
-    cli = RichTelegramCLI()
+    cli = _get_cli(ctx)
     cli.add_route_interactive()
 
 @cli.command()
-def remove_route():
+@click.pass_context
+def remove_route(ctx):
     """Remover rota interativamente"""
-    cli = RichTelegramCLI()
+    cli = _get_cli(ctx)
     cli.remove_route_interactive()
 
 @cli.command()
 def run():
     """Executar backup diretamente"""
+    from telegram_backup import run_backup
+    
     console.print("[bold green]🚀 Iniciando backup...[/bold green]")
     run_backup()
 
@@ -366,10 +389,11 @@ def run():
 @click.option('--media-only', is_flag=True, help='Apenas mídia')
 @click.option('--no-photos', is_flag=True, help='Desabilitar fotos')
 @click.option('--no-videos', is_flag=True, help='Desabilitar vídeos')
-def quick_backup(source, dest, media_only, no_photos, no_videos):
+@click.pass_context
+def quick_backup(ctx, source, dest, media_only, no_photos, no_videos):
     """Backup rápido com parâmetros"""
     try:
-        cli = RichTelegramCLI()
+        cli = _get_cli(ctx)
         
         # Configurar rota
         if cli.manager.add_route(source, dest):
@@ -394,24 +418,45 @@ def quick_backup(source, dest, media_only, no_photos, no_videos):
 
 @cli.command()
 @click.option('--config', help='Caminho para arquivo de configuração')
-def setup(config):
+@click.pass_context
+def setup(ctx, config):
     """Configurar sistema"""
+    from database import json_loads
+    from models import BackupFilters
+    
     try:
-        if config and os.path.exists(config):
-            # Carregar configuração externa
-            with open(config, 'r', encoding='utf-8') as f:
-                config_data = json.load(f)
-            
-            cli = RichTelegramCLI()
-            cli.manager.config.routes = config_data.get("routes", {})
-            cli.manager.config.filters.update(config_data.get("filters", {}))
-            cli.manager.save_config()
+        config_data = None
+        if config:
+            # Carregar configuração externa (arquivo ausente cai na configuração padrão)
+            try:
+                with open(config, 'rb') as f:
+                    config_data = json_loads(f.read())
+            except FileNotFoundError:
+                pass
+        
+        if config_data is not None:
+            cli = _get_cli(ctx)
+            # IDs podem vir como números no JSON; rotas são gravadas como texto
+            routes = {
+                str(source): str(destination)
+                for source, destination in config_data.get("routes", {}).items()
+            }
+            filters = {
+                **cli.manager.config.filters.model_dump(),
+                **{
+                    key: bool(value) for key, value in config_data.get("filters", {}).items()
+                    if key in BackupFilters.model_fields
+                },
+            }
+            cli.manager.db.replace_routes(routes, filters)
+            # Recarrega config, retrato salvo e predicado a partir do banco
+            cli.manager.reload_config()
             
             console.print("[green]✅ Configuração importada com sucesso![/green]")
         else:
             console.print("[yellow]Usando configuração padrão[/yellow]")
             # Criar configuração padrão
-            cli = RichTelegramCLI()
+            cli = _get_cli(ctx)
             console.print("[green]✅ Configuração padrão criada[/green]")
     
     except Exception as e:
@@ -6,156 +6,378 @@ Handles SQLite operations and persistence
 import sqlite3
 import json
 import logging
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from functools import cached_property
 from pathlib import Path
-from typing import Dict, Any, Optional
-from datetime import datetime
-from models import BackupConfig, BackupSettings, BackupFilters, BackupStats
+from typing import Dict, Any, Iterable, Optional, Tuple
+from models import BackupConfig, BackupSettings, BackupFilters, BackupStats, RateLimitConfig
+
+try:
+    import orjson
+except ImportError:  # optional speedup, see the 'speedups' extra
+    orjson = None
 
 logger = logging.getLogger(__name__)
 
+# State writes are coalesced in memory and flushed in batches
+STATE_FLUSH_EVERY = 100      # pending updates
+STATE_FLUSH_INTERVAL = 5.0   # seconds
+
+# Idle read-only connections kept for reuse (WAL lets them read while the writer commits)
+READ_POOL_SIZE = 4
+
+# Hot-path statements. sqlite3 keeps compiled statements per connection keyed by the
+# SQL text, so reusing the same string object means each one is planned only once.
+UPSERT_STATE_SQL = """
+INSERT INTO backup_state (entity_id, last_message_id) VALUES (?, ?)
+ON CONFLICT (entity_id) DO UPDATE SET
+    last_message_id = excluded.last_message_id,
+    updated_at = CURRENT_TIMESTAMP
+WHERE excluded.last_message_id > backup_state.last_message_id
+"""
+BUMP_PROCESSED_SQL = "UPDATE counters SET value = value + ? WHERE name = 'processed_messages'"
+SELECT_STATE_SQL = "SELECT entity_id, last_message_id FROM backup_state"
+MAX_MESSAGE_ID_SQL = "SELECT MAX(last_message_id) FROM backup_state"
+TOTAL_PROCESSED_SQL = "SELECT value FROM counters WHERE name = 'processed_messages'"
+
+if orjson is not None:
+    json_loads = orjson.loads
+
+    def json_dumps(value: Any) -> str:
+        return orjson.dumps(value).decode()
+else:
+    json_loads = json.loads
+    json_dumps = json.dumps
+
+# Decoders for the settings.type column
+SETTING_DECODERS = {
+    "json": json_loads,
+    "int": int,
+    "str": str,
+}
+
+def _encode_setting(value: Any) -> Tuple[str, str]:
+    """Return (type, text) for a settings value"""
+    if isinstance(value, str):
+        return "str", value
+    if isinstance(value, int) and not isinstance(value, bool):
+        return "int", str(value)
+    return "json", json_dumps(value)
+
+# Whole schema in one script: a single parse/execute round-trip per start-up.
+# Seeds use INSERT OR IGNORE so existing values are never overwritten.
+_SCHEMA_SQL = """
+BEGIN IMMEDIATE;
+
+-- Routes table
+CREATE TABLE IF NOT EXISTS routes (
+    source TEXT PRIMARY KEY,
+    destination TEXT NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Filters table (key-value store for filter settings)
+CREATE TABLE IF NOT EXISTS filters (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL -- Boolean stored as 0/1
+);
+
+-- Settings table (key-value; type says how to decode value)
+CREATE TABLE IF NOT EXISTS settings (
+    key TEXT PRIMARY KEY,
+    type TEXT NOT NULL DEFAULT 'str', -- 'json' | 'int' | 'str'
+    value TEXT NOT NULL
+);
+
+-- Backup State table (clustered on entity_id: upserts and lookups are one B-tree probe)
+CREATE TABLE IF NOT EXISTS backup_state (
+    entity_id TEXT PRIMARY KEY,
+    last_message_id INTEGER DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS ix_backup_state_mid ON backup_state (last_message_id);
+
+-- Counters table (running totals kept up to date at write time)
+CREATE TABLE IF NOT EXISTS counters (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL DEFAULT 0
+) WITHOUT ROWID;
+
+-- Defaults
+INSERT OR IGNORE INTO counters (name, value) VALUES ('processed_messages', 0);
+INSERT OR IGNORE INTO filters (key, value) VALUES
+    ('media_only', 0),
+    ('photos', 1),
+    ('videos', 1),
+    ('documents', 0),
+    ('text_messages', 1);
+
+COMMIT;
+"""
+
 class DatabaseManager:
     def __init__(self, db_path: str = "backup.db"):
         self.db_path = Path(db_path)
+        self._lock = threading.RLock()
+        self._state_buf: Dict[str, int] = {}
+        # Buffered updates per entity that advanced its position (feeds the processed counter)
+        self._state_hits: Dict[str, int] = {}
+        self._pending_updates = 0
+        self._last_flush = time.monotonic()
+        self._readers: "queue.SimpleQueue[sqlite3.Connection]" = queue.SimpleQueue()
         self.init_db()
 
+    @cached_property
+    def conn(self) -> sqlite3.Connection:
+        """Long-lived writer connection, opened and configured once.
+
+        Reusing it avoids reopening the file (and an fsync per implicit
+        transaction) on every call. Writers take ``self._lock``; plain
+        reads go through ``_read()`` so they never queue behind a flush.
+        """
+        conn = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        conn.execute("PRAGMA busy_timeout=5000")
+        return conn
+
+    @contextmanager
+    def _read(self):
+        """Borrow a read-only connection from the pool, opening one if none is idle"""
+        try:
+            conn = self._readers.get_nowait()
+        except queue.Empty:
+            conn = sqlite3.connect(
+                f"{self.db_path.resolve().as_uri()}?mode=ro",
+                uri=True, check_same_thread=False, isolation_level=None
+            )
+        try:
+            yield conn
+        finally:
+            if self._readers.qsize() < READ_POOL_SIZE:
+                self._readers.put(conn)
+            else:
+                conn.close()
+
+    def data_version(self) -> int:
+        """Changes whenever another connection (e.g. another process) commits"""
+        return self.conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def change_token(self) -> Tuple[int, int]:
+        """Cheap token that changes after any commit, ours or another connection's"""
+        return self.data_version(), self.conn.total_changes
+
     def get_connection(self):
-        return sqlite3.connect(self.db_path)
+        return self.conn
+
+    @contextmanager
+    def _transaction(self):
+        """Group writes into one explicit transaction (autocommit connection).
+
+        Nested use joins the outer transaction.
+        """
+        with self._lock:
+            if self.conn.in_transaction:
+                yield self.conn
+                return
+            # IMMEDIATE takes the write lock up front, so a concurrent writer
+            # (dashboard vs. service) waits on busy_timeout instead of failing
+            # with SQLITE_BUSY when a deferred transaction tries to upgrade
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield self.conn
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+            else:
+                self.conn.execute("COMMIT")
 
     def init_db(self):
         """Initialize database schema"""
         try:
-            with self.get_connection() as conn:
-                cursor = conn.cursor()
+            # executescript runs its own BEGIN ... COMMIT (see _SCHEMA_SQL)
+            with self._lock:
+                self.conn.executescript(_SCHEMA_SQL)
 
-                # Routes table
-                cursor.execute("""
-                    CREATE TABLE IF NOT EXISTS routes (
-                        source TEXT PRIMARY KEY,
-                        destination TEXT NOT NULL,
-                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                    )
-                """)
-
-                # Filters table (key-value store for filter settings)
-                cursor.execute("""
-                    CREATE TABLE IF NOT EXISTS filters (
-                        key TEXT PRIMARY KEY,
-                        value INTEGER NOT NULL -- Boolean stored as 0/1
-                    )
-                """)
-
-                # Settings table (JSON blob for nested settings or key-value)
-                cursor.execute("""
-                    CREATE TABLE IF NOT EXISTS settings (
-                        key TEXT PRIMARY KEY,
-                        value TEXT NOT NULL
-                    )
-                """)
-
-                # Backup State table
-                cursor.execute("""
-                    CREATE TABLE IF NOT EXISTS backup_state (
-                        entity_id TEXT PRIMARY KEY,
-                        last_message_id INTEGER DEFAULT 0,
-                        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                    )
-                """)
-
-                # Initialize default filters if empty
-                cursor.execute("SELECT COUNT(*) FROM filters")
-                if cursor.fetchone()[0] == 0:
-                    defaults = {
-                        "media_only": 0,
-                        "photos": 1,
-                        "videos": 1,
-                        "documents": 0,
-                        "text_messages": 1
-                    }
-                    cursor.executemany(
-                        "INSERT INTO filters (key, value) VALUES (?, ?)",
-                        defaults.items()
-                    )
-
-                conn.commit()
+            with self._transaction() as conn:
+                columns = {row[1] for row in conn.execute("PRAGMA table_info(settings)")}
+                if "type" not in columns:
+                    # One-shot migration of databases created before the type column
+                    conn.execute("ALTER TABLE settings ADD COLUMN type TEXT NOT NULL DEFAULT 'str'")
+                    conn.execute("""
+                        UPDATE settings SET type = CASE
+                            WHEN value GLOB '[0-9]*' AND CAST(CAST(value AS INTEGER) AS TEXT) = value THEN 'int'
+                            WHEN json_valid(value) THEN 'json'
+                            ELSE 'str'
+                        END
+                    """)
         except Exception as e:
-            logger.error(f"Failed to initialize database: {e}")
+            logger.error("Failed to initialize database: %s", e)
             raise
 
     def load_config(self) -> BackupConfig:
         """Load full configuration from DB"""
         try:
-            with self.get_connection() as conn:
+            with self._read() as conn:
                 cursor = conn.cursor()
 
                 # Load Routes
-                cursor.execute("SELECT source, destination FROM routes")
-                routes = {row[0]: row[1] for row in cursor.fetchall()}
+                routes = dict(cursor.execute("SELECT source, destination FROM routes"))
 
-                # Load Filters
-                cursor.execute("SELECT key, value FROM filters")
-                filters_dict = {row[0]: bool(row[1]) for row in cursor.fetchall()}
-                filters = BackupFilters(**filters_dict)
+                # Load Filters. Rows are written by us, so skip validation
+                filters = BackupFilters.model_construct(**{
+                    key: bool(value)
+                    for key, value in cursor.execute("SELECT key, value FROM filters")
+                })
 
                 # Load Settings
-                cursor.execute("SELECT key, value FROM settings")
-                settings_dict = {}
-                for key, value in cursor.fetchall():
-                    try:
-                        settings_dict[key] = json.loads(value)
-                    except json.JSONDecodeError:
-                        settings_dict[key] = value
-
-                # Construct Settings object (handle defaults if empty)
-                settings = BackupSettings(**settings_dict) if settings_dict else BackupSettings()
-
-                return BackupConfig(
+                settings_dict = {
+                    key: SETTING_DECODERS.get(kind, str)(value)
+                    for key, kind, value in cursor.execute("SELECT key, type, value FROM settings")
+                }
+
+                # Construct Settings object (trusted data; defaults fill missing keys)
+                if isinstance(settings_dict.get("rate_limit"), dict):
+                    settings_dict["rate_limit"] = RateLimitConfig.model_construct(**settings_dict["rate_limit"])
+                settings = BackupSettings.model_construct(**settings_dict)
+
+                return BackupConfig.model_construct(
                     routes=routes,
                     filters=filters,
                     settings=settings
                 )
         except Exception as e:
-            logger.error(f"Error loading config: {e}")
+            logger.error("Error loading config: %s", e)
             return BackupConfig()
 
     def save_route(self, source: str, destination: str):
-        with self.get_connection() as conn:
+        with self._transaction() as conn:
             conn.execute(
                 "INSERT OR REPLACE INTO routes (source, destination) VALUES (?, ?)",
                 (source, destination)
             )
 
     def remove_route(self, source: str):
-        with self.get_connection() as conn:
+        with self._transaction() as conn:
             conn.execute("DELETE FROM routes WHERE source = ?", (source,))
 
     def update_filters(self, filters: Dict[str, bool]):
-        with self.get_connection() as conn:
+        with self._transaction() as conn:
             conn.executemany(
                 "INSERT OR REPLACE INTO filters (key, value) VALUES (?, ?)",
                 [(k, 1 if v else 0) for k, v in filters.items()]
             )
 
-    def update_state(self, entity_id: str, message_id: int):
-        with self.get_connection() as conn:
-            conn.execute(
-                "INSERT OR REPLACE INTO backup_state (entity_id, last_message_id, updated_at) VALUES (?, ?, ?)",
-                (entity_id, message_id, datetime.now())
+    def replace_routes(self, routes: Dict[str, str], filters: Optional[Dict[str, bool]] = None):
+        """Replace all routes (and optionally filters) in a single transaction"""
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM routes")
+            conn.executemany(
+                "INSERT INTO routes (source, destination) VALUES (?, ?)",
+                routes.items()
             )
+            if filters is not None:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO filters (key, value) VALUES (?, ?)",
+                    [(k, 1 if v else 0) for k, v in filters.items()]
+                )
+
+    def update_settings(self, settings: Dict[str, Any]):
+        with self._transaction() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO settings (key, type, value) VALUES (?, ?, ?)",
+                [(k, *_encode_setting(v)) for k, v in settings.items()]
+            )
+
+    def save_config(self, config: BackupConfig):
+        """Write routes, filters and settings atomically in one transaction"""
+        with self._transaction():
+            self.replace_routes(config.routes, config.filters.model_dump())
+            self.update_settings(config.settings.model_dump())
+
+    def update_state(self, entity_id: str, message_id: int):
+        """Buffer the last processed message id; flushed every N updates or T seconds"""
+        with self._lock:
+            if message_id > self._state_buf.get(entity_id, 0):
+                self._state_buf[entity_id] = message_id
+                self._state_hits[entity_id] = self._state_hits.get(entity_id, 0) + 1
+            self._pending_updates += 1
+            self._maybe_flush()
+
+    def update_state_bulk(self, updates: Iterable[Tuple[str, int]]):
+        """Buffer many (entity_id, message_id) updates under a single lock acquisition"""
+        with self._lock:
+            buf, hits = self._state_buf, self._state_hits
+            for entity_id, message_id in updates:
+                if message_id > buf.get(entity_id, 0):
+                    buf[entity_id] = message_id
+                    hits[entity_id] = hits.get(entity_id, 0) + 1
+                self._pending_updates += 1
+            self._maybe_flush()
+
+    def _maybe_flush(self):
+        if (self._pending_updates >= STATE_FLUSH_EVERY
+                or time.monotonic() - self._last_flush >= STATE_FLUSH_INTERVAL):
+            self.flush()
+
+    def flush(self):
+        """Persist buffered state updates in a single transaction"""
+        with self._lock:
+            if self._state_buf:
+                with self._transaction() as conn:
+                    # updated_at comes from SQLite; stale or duplicate ids are no-ops
+                    # (rowcount 0), and their updates are left out of the counter
+                    processed = 0
+                    for entity_id, message_id in self._state_buf.items():
+                        if conn.execute(UPSERT_STATE_SQL, (entity_id, message_id)).rowcount:
+                            processed += self._state_hits.get(entity_id, 0)
+                    if processed:
+                        conn.execute(BUMP_PROCESSED_SQL, (processed,))
+                self._state_buf.clear()
+                self._state_hits.clear()
+            self._pending_updates = 0
+            self._last_flush = time.monotonic()
 
     def get_state(self) -> Dict[str, int]:
-        with self.get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute("SELECT entity_id, last_message_id FROM backup_state")
-            return {row[0]: row[1] for row in cursor.fetchall()}
+        with self._read() as conn:
+            state = dict(conn.execute(SELECT_STATE_SQL))
+        # Include updates that are still waiting for a flush
+        with self._lock:
+            for entity_id, message_id in self._state_buf.items():
+                if message_id > state.get(entity_id, 0):
+                    state[entity_id] = message_id
+        return state
+
+    def count_states(self) -> int:
+        """Number of entities with a saved position, including unflushed ones"""
+        with self._lock:
+            pending = list(self._state_buf)
+        with self._read() as conn:
+            if not pending:
+                return conn.execute("SELECT COUNT(*) FROM backup_state").fetchone()[0]
+            placeholders = ",".join("?" * len(pending))
+            stored = conn.execute(
+                f"SELECT COUNT(*) FROM backup_state WHERE entity_id NOT IN ({placeholders})",
+                pending
+            ).fetchone()[0]
+        return stored + len(pending)
+
+    def get_max_message_id(self) -> int:
+        """Highest saved message id across entities (served by ix_backup_state_mid)"""
+        with self._read() as conn:
+            stored = conn.execute(MAX_MESSAGE_ID_SQL).fetchone()[0] or 0
+        with self._lock:
+            pending = max(self._state_buf.values(), default=0)
+        return max(stored, pending)
 
     def get_total_processed_messages(self) -> int:
-        """Estimate total processed based on state (not exact but useful metric)"""
-        # Actually, for total processed count, we might want a separate counter or sum(last_message_id)
-        # which isn't accurate as message IDs are not sequential starting from 0 per backup run.
-        # But for now, we can count rows in state or keep the old logic of 'len(state)' which was 'number of chats tracked'.
-        # The user report said: "processed_messages: len(state)".
-        # Wait, len(state) is just number of chats tracked, not total messages.
-        # I'll stick to returning the state dict length for compatibility with existing stats logic for now,
-        # or implement a proper counter table if needed.
-        # Let's assume the previous logic: processed_messages = len(state).
-        return len(self.get_state())
+        """Total messages processed, including updates not yet flushed"""
+        with self._read() as conn:
+            row = conn.execute(TOTAL_PROCESSED_SQL).fetchone()
+        with self._lock:
+            pending = sum(self._state_hits.values())
+        return (row[0] if row else 0) + pending
@@ -3,7 +3,7 @@ Pydantic Models for Telegram Backup Manager
 """
 
 from typing import Dict, Optional, Any
-from pydantic import BaseModel, Field, validator
+from pydantic import BaseModel, Field
 from datetime import datetime
 from enum import Enum
 
@@ -35,6 +35,15 @@ class BackupFilters(BaseModel):
     documents: bool = False
     text_messages: bool = True
 
+# Rótulos de exibição dos filtros (chaves fixas de BackupFilters)
+FILTER_LABELS = {
+    "media_only": "Media Only",
+    "photos": "Photos",
+    "videos": "Videos",
+    "documents": "Documents",
+    "text_messages": "Text Messages",
+}
+
 class BackupConfig(BaseModel):
     """Configuration model"""
     routes: Dict[str, str] = Field(default_factory=dict)
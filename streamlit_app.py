@@ -1,22 +1,20 @@
 import streamlit as st
 import asyncio
-import json
+import html
 import os
 import sys
 import subprocess
 import signal
-import time
 from datetime import datetime
-from pathlib import Path
 import pandas as pd
-from typing import Dict, List, Any, Optional
-import plotly.graph_objects as go
-import plotly.express as px
-from streamlit_autorefresh import st_autorefresh
+import psutil
+from typing import Optional
 
 # Importar backend
-from telegram_backup import TelegramBackupManager, create_backup_manager
-from models import BackupConfig, BackupStats
+from telegram_backup import TelegramBackupManager
+from backup_service import wait_for_service_exit
+from database import json_dumps
+from models import BackupStats, FILTER_LABELS
 
 # Configuração da página
 st.set_page_config(
@@ -27,7 +25,7 @@ st.set_page_config(
 )
 
 # Configuração de tema customizado
-st.markdown("""
+APP_CSS = """
     <style>
     .main-header {
         background: linear-gradient(135deg, #5c7359, #485d46);
@@ -108,72 +106,193 @@ st.markdown("""
         margin: 1rem 0;
     }
     </style>
-""", unsafe_allow_html=True)
+"""
+
+# Precisa ser emitido a cada execução: o Streamlit remove da página os
+# elementos que não foram renderizados na execução corrente.
+st.markdown(APP_CSS, unsafe_allow_html=True)
+
+# Templates dos cards do dashboard: CARD_TMPL usa campos nomeados de str.format;
+# METRIC_CARDS_TPL recebe com % o HTML dos cards já concatenado
+CARD_TMPL = (
+    '<div class="metric-card">'
+    '<div class="flex items-center mb-2">'
+    '<div class="status-indicator {status_class}"></div>'
+    '<span class="text-sm font-medium text-charcoal-600">{title}</span>'
+    '</div>'
+    '<div class="text-2xl font-bold text-sage-600">{value}</div>'
+    '<div class="text-xs text-charcoal-500">{subtitle}</div>'
+    '</div>'
+)
+METRIC_CARDS_TPL = '<div style="display: grid; grid-template-columns: repeat(4, 1fr); gap: 1rem">%s</div>'
 
 # Service Management Functions
 SERVICE_PID_FILE = "service.pid"
 
-def is_service_running() -> bool:
-    if not os.path.exists(SERVICE_PID_FILE):
-        return False
+# Intervalo (s) de atualização automática do Dashboard e dos Logs
+REFRESH_INTERVAL = 10
+
+# Informações fixas da barra lateral, serializadas uma vez
+SYSTEM_INFO_JSON = json_dumps({
+    "Sistema": "Telegram Backup CLI",
+    "Versão": "2.0.0",
+    "Interface": "Streamlit Web UI",
+    "Python": "3.8+"
+})
+
+LOG_FILE = "telegram_backup.log"
+LOG_TAIL_LINES = 20
+LOG_TAIL_BYTES = 8192
+
+@st.cache_resource(show_spinner=False)
+def _service_handle(pid: int) -> Optional[psutil.Process]:
+    """Handle do processo, só se o PID for de fato o backup_service.py"""
+    try:
+        proc = psutil.Process(pid)
+        if any(part.endswith("backup_service.py") for part in proc.cmdline()):
+            return proc
+    except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+        pass
+    return None
+
+def read_service_pid() -> Optional[int]:
+    """PID do serviço em execução, ou None (um único open, sem stat prévio)"""
     try:
         with open(SERVICE_PID_FILE, "r") as f:
             pid = int(f.read().strip())
-        
-        # Check if process exists
-        try:
-            os.kill(pid, 0)
-            return True
-        except OSError:
-            # Stale PID file
-            return False
     except (ValueError, FileNotFoundError):
+        return None
+
+    # is_running() também compara o horário de criação, o que protege
+    # contra reuso de PID; um filho já encerrado e não coletado é zumbi.
+    proc = _service_handle(pid)
+    try:
+        if proc is None or not proc.is_running() or proc.status() == psutil.STATUS_ZOMBIE:
+            # Stale PID file
+            return None
+    except psutil.NoSuchProcess:
+        return None
+    return pid
+
+@st.cache_data(ttl=2, show_spinner=False)
+def _probe_service(pid_mtime_ns: int) -> bool:
+    return read_service_pid() is not None
+
+def is_service_running() -> bool:
+    """Status do serviço, sondado no máximo a cada 2s por versão do arquivo de PID"""
+    try:
+        pid_mtime_ns = os.stat(SERVICE_PID_FILE).st_mtime_ns
+    except FileNotFoundError:
         return False
+    return _probe_service(pid_mtime_ns)
 
 def start_service():
-    if is_service_running():
+    if read_service_pid() is not None:
         st.warning("Service is already running.")
         return
 
     try:
-        # Use sys.executable to ensure we use the same python interpreter
-        subprocess.Popen([sys.executable, "backup_service.py"])
+        # Use sys.executable to ensure we use the same python interpreter.
+        # Own session and no inherited fds: the service survives a Ctrl-C
+        # on Streamlit and does not hold the server socket open. Its output
+        # already goes to telegram_backup.log through the FileHandler.
+        proc = subprocess.Popen(
+            [sys.executable, "backup_service.py"],
+            start_new_session=True,
+            close_fds=True,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL
+        )
+        # Written by the parent, so the status is right on the next run
+        with open(SERVICE_PID_FILE, "w") as f:
+            f.write(str(proc.pid))
         st.success("Service started successfully!")
-        time.sleep(1) # Wait for startup
+        _probe_service.clear()
+        _service_handle.clear()
         st.rerun()
     except Exception as e:
         st.error(f"Failed to start service: {e}")
 
 def stop_service():
-    if not is_service_running():
+    pid = read_service_pid()
+    if pid is None:
         st.warning("Service is not running.")
         return
 
     try:
-        with open(SERVICE_PID_FILE, "r") as f:
-            pid = int(f.read().strip())
-        
         os.kill(pid, signal.SIGTERM)
         st.success("Stop signal sent to service.")
-        time.sleep(1) # Wait for cleanup
+        # Wait for cleanup (returns as soon as the process exits)
+        asyncio.run(wait_for_service_exit(pid, timeout=5))
+        _probe_service.clear()
+        _service_handle.clear()
         st.rerun()
     except Exception as e:
         st.error(f"Failed to stop service: {e}")
 
+@st.cache_data(show_spinner=False, max_entries=4)
+def _tail_log_html(mtime_ns: int, size: int) -> str:
+    """Últimas linhas do log como HTML escapado, lendo só o fim do arquivo.
+
+    A chave (mtime, tamanho) faz com que o arquivo só seja relido quando muda.
+    """
+    offset = max(0, size - LOG_TAIL_BYTES)
+    with open(LOG_FILE, "rb") as f:
+        f.seek(offset)
+        lines = f.read().decode("utf-8", "replace").splitlines()
+    if offset:
+        # A primeira linha do bloco provavelmente está cortada
+        lines = lines[1:]
+    return "<br>".join(html.escape(line) for line in lines[-LOG_TAIL_LINES:])
+
+@st.cache_data(show_spinner=False, max_entries=8)
+def _routes_frame(route_items: tuple) -> pd.DataFrame:
+    """Tabela de rotas montada por colunas; refeita só quando as rotas mudam"""
+    return pd.DataFrame({
+        "Origem": [source for source, _ in route_items],
+        "Destino": [destination for _, destination in route_items],
+        "Status": ["✅ Ativa"] * len(route_items)
+    })
+
+@st.cache_resource
+def _status_template() -> pd.DataFrame:
+    """Coluna estática da tabela de status (copiar antes de alterar)"""
+    return pd.DataFrame({
+        "Componente": pd.Categorical(["Service Runner", "Conexão DB"])
+    })
+
 # Inicializar gerenciador
 @st.cache_resource
 def get_manager():
     return TelegramBackupManager()
 
+@st.cache_data(ttl=5, show_spinner=False)
+def _cached_stats(_manager: TelegramBackupManager, change_token) -> BackupStats:
+    """Estatísticas por até 5s; qualquer commit no banco muda a chave"""
+    return _manager.get_stats()
+
+@st.cache_data(show_spinner=False, max_entries=1)
+def _config_json(route_items: tuple, filter_items: tuple) -> str:
+    """JSON da visualização de configuração, refeito só quando rotas ou filtros mudam"""
+    return json_dumps({
+        "rotas": dict(route_items),
+        "filtros": dict(filter_items)
+    })
+
 manager = get_manager()
 
+# Configuração e estatísticas são lidas uma única vez por execução do script
+config = manager.load_config()
+routes, current_filters = config.routes, config.filters
+stats = _cached_stats(manager, manager.db.change_token())
+
 # Sidebar
 with st.sidebar:
     st.markdown("### 🎛️ Controle Rápido")
     
     # Status do sistema
     st.markdown("#### 📊 Status")
-    stats = manager.get_stats()
     
     col1, col2 = st.columns(2)
     with col1:
@@ -185,23 +304,21 @@ with st.sidebar:
     st.markdown("#### ⚡ Ações Rápidas")
     
     if st.button("🚀 Iniciar Backup", use_container_width=True):
-        st.session_state.show_backup_modal = True
+        st.session_state.active_modal = "backup"
     
     if st.button("➕ Adicionar Rota", use_container_width=True):
-        st.session_state.show_add_route = True
+        st.session_state.active_modal = "add_route"
     
     if st.button("⚙️ Configurar Filtros", use_container_width=True):
-        st.session_state.show_filters = True
+        st.session_state.active_modal = "filters"
+    
+    # Atualização automática desligada por padrão: cada ciclo refaz leituras
+    auto_refresh = st.toggle("🔁 Atualização automática", value=False)
     
     # Informações do sistema
     st.markdown("#### ℹ️ Informações")
-    st.json({
-        "Sistema": "Telegram Backup CLI",
-        "Versão": "2.0.0",
-        "Interface": "Streamlit Web UI",
-        "Python": "3.8+",
-        "Última Atualização": datetime.now().strftime("%d/%m/%Y %H:%M")
-    })
+    st.json(SYSTEM_INFO_JSON)
+    st.caption(f"Última atualização: {datetime.now():%d/%m/%Y %H:%M}")
 
 # Main content
 st.markdown('<h1 class="main-header">🚀 Telegram Backup Manager</h1>', unsafe_allow_html=True)
@@ -210,67 +327,36 @@ st.markdown("Sistema profissional de backup para Telegram com interface web mode
 # Tabs principais
 tab1, tab2, tab3, tab4 = st.tabs(["📊 Dashboard", "🛣️ Rotas", "⚙️ Configuração", "📋 Logs"])
 
-with tab1:
-    # Dashboard principal
-    st.markdown("### 📊 Dashboard Principal")
-    
+# Dashboard e Logs rodam como fragments: só eles são reexecutados no
+# intervalo, o restante da página fica parado até haver interação.
+refresh_every = REFRESH_INTERVAL if auto_refresh else None
+
+@st.fragment(run_every=refresh_every)
+def dashboard_fragment():
     service_status = is_service_running()
+    stats = _cached_stats(manager, manager.db.change_token())
+    now_hms = datetime.now().strftime("%H:%M:%S")
+    
     status_text = "Online" if service_status else "Offline"
     status_class = "status-online" if service_status else "status-offline"
 
-    # Cards de métricas
-    col1, col2, col3, col4 = st.columns(4)
-    
-    with col1:
-        st.markdown(f'''
-        <div class="metric-card">
-            <div class="flex items-center mb-2">
-                <div class="status-indicator {status_class}"></div>
-                <span class="text-sm font-medium text-charcoal-600">Serviço de Backup</span>
-            </div>
-            <div class="text-2xl font-bold text-sage-600">{status_text}</div>
-            <div class="text-xs text-charcoal-500">Última verificação: {datetime.now().strftime("%H:%M:%S")}</div>
-        </div>
-        ''', unsafe_allow_html=True)
-    
-    with col2:
-        st.markdown(f'''
-        <div class="metric-card">
-            <div class="flex items-center mb-2">
-                <div class="status-indicator status-online"></div>
-                <span class="text-sm font-medium text-charcoal-600">Rotas Configuradas</span>
-            </div>
-            <div class="text-2xl font-bold text-sage-600">{stats.total_routes}</div>
-            <div class="text-xs text-charcoal-500">Ativas e funcionando</div>
-        </div>
-        ''', unsafe_allow_html=True)
-    
-    with col3:
-        st.markdown(f'''
-        <div class="metric-card">
-            <div class="flex items-center mb-2">
-                <div class="status-indicator status-warning"></div>
-                <span class="text-sm font-medium text-charcoal-600">Chats Monitorados</span>
-            </div>
-            <div class="text-2xl font-bold text-sage-600">{stats.processed_messages}</div>
-            <div class="text-xs text-charcoal-500">Total acumulado</div>
-        </div>
-        ''', unsafe_allow_html=True)
-    
-    with col4:
-        # Count active filters
-        filters_dict = manager.config.filters.dict()
-        active_filters = sum(1 for v in filters_dict.values() if v)
-        st.markdown(f'''
-        <div class="metric-card">
-            <div class="flex items-center mb-2">
-                <div class="status-indicator status-online"></div>
-                <span class="text-sm font-medium text-charcoal-600">Filtros Ativos</span>
-            </div>
-            <div class="text-2xl font-bold text-sage-600">{active_filters}</div>
-            <div class="text-xs text-charcoal-500">Configurações aplicadas</div>
-        </div>
-        ''', unsafe_allow_html=True)
+    # Cards de métricas (um único elemento, lado a lado via CSS grid)
+    filters = manager.load_config().filters
+    active_filters = sum(getattr(filters, name) for name in FILTER_LABELS)
+    cards = (
+        (status_class, "Serviço de Backup", status_text, "Última verificação: " + now_hms),
+        ("status-online", "Rotas Configuradas", stats.total_routes, "Ativas e funcionando"),
+        ("status-warning", "Mensagens Processadas", stats.processed_messages, "Total acumulado"),
+        ("status-online", "Filtros Ativos", active_filters, "Configurações aplicadas"),
+    )
+    dashboard_ph = st.empty()
+    dashboard_ph.markdown(
+        METRIC_CARDS_TPL % "".join([
+            CARD_TMPL.format(status_class=status_cls, title=title, value=value, subtitle=subtitle)
+            for status_cls, title, value, subtitle in cards
+        ]),
+        unsafe_allow_html=True
+    )
     
     # Seção de controle
     st.markdown("### 🎮 Controle do Sistema")
@@ -289,31 +375,119 @@ with tab1:
         if st.button("🔄 Atualizar UI", use_container_width=True):
             st.rerun()
 
+@st.fragment(run_every=refresh_every)
+def logs_fragment():
+    st.markdown("#### 📝 Logs do Serviço")
+    
+    try:
+        log_stat = os.stat(LOG_FILE)
+    except FileNotFoundError:
+        st.info("Nenhum arquivo de log encontrado.")
+    else:
+        # Um único elemento para todas as linhas
+        log_html = _tail_log_html(log_stat.st_mtime_ns, log_stat.st_size)
+        st.markdown(f'<div class="terminal-output">{log_html}</div>', unsafe_allow_html=True)
+    
+    # Status do sistema
+    st.markdown("#### 🔍 Status Detalhado")
+    
+    # Só as colunas dinâmicas são preenchidas por execução
+    service_status = is_service_running()
+    df_status = _status_template().copy()
+    df_status["Status"] = ["✅ Ativo" if service_status else "🔴 Parado", "✅ Conectado"]
+    df_status["Última Verificação"] = datetime.now().strftime("%H:%M:%S")
+    st.table(df_status)
+
+# Formulários compartilhados pela aba correspondente e pelos modais da sidebar
+def _close_modal():
+    st.session_state.active_modal = None
+    st.rerun()
+
+def render_add_route_form(prefix: str, on_close=None):
+    """Formulário de nova rota; `on_close` adiciona o botão Cancelar"""
+    with st.form(f"{prefix}_add_route", clear_on_submit=True):
+        col1, col2 = st.columns(2)
+        
+        with col1:
+            source = st.text_input("Origem (ID ou @username)", placeholder="@meu_canal ou 123456789",
+                                   key=f"{prefix}_source")
+        
+        with col2:
+            destination = st.text_input("Destino", placeholder="me ou ID do chat",
+                                        key=f"{prefix}_destination")
+        
+        col1, col2 = st.columns(2)
+        with col1:
+            submitted = st.form_submit_button("Adicionar Rota")
+        if on_close is not None:
+            with col2:
+                if st.form_submit_button("Cancelar"):
+                    on_close()
+        
+        if submitted and source and destination:
+            if manager.add_route(source, destination):
+                st.success(f"✅ Rota {source} → {destination} adicionada com sucesso!")
+                (on_close or st.rerun)()
+            else:
+                st.error("❌ Erro ao adicionar rota")
+
+def render_filters_form(prefix: str, on_close=None):
+    """Formulário de filtros de conteúdo; `on_close` adiciona o botão Cancelar"""
+    with st.form(f"{prefix}_filters"):
+        col1, col2 = st.columns(2)
+        
+        with col1:
+            media_only = st.checkbox("Apenas Mídia", value=current_filters.media_only, key=f"{prefix}_media_only")
+            photos = st.checkbox("Incluir Fotos", value=current_filters.photos, key=f"{prefix}_photos")
+        
+        with col2:
+            videos = st.checkbox("Incluir Vídeos", value=current_filters.videos, key=f"{prefix}_videos")
+            documents = st.checkbox("Incluir Documentos", value=current_filters.documents,
+                                    key=f"{prefix}_documents")
+        
+        col1, col2 = st.columns(2)
+        with col1:
+            submitted = st.form_submit_button("💾 Salvar Configuração de Filtros")
+        if on_close is not None:
+            with col2:
+                if st.form_submit_button("Cancelar"):
+                    on_close()
+        
+        if submitted:
+            if manager.update_filters(
+                media_only=media_only,
+                photos=photos,
+                videos=videos,
+                documents=documents
+            ):
+                st.success("✅ Configuração de filtros salva com sucesso!")
+                (on_close or st.rerun)()
+            else:
+                st.error("❌ Erro ao salvar configuração")
+
+with tab1:
+    # Dashboard principal
+    st.markdown("### 📊 Dashboard Principal")
+    dashboard_fragment()
+
 with tab2:
     # Gerenciamento de rotas
     st.markdown("### 🛣️ Gerenciamento de Rotas")
     
-    manager.reload_config()
-    routes = manager.config.routes
-    
     if routes:
         # Mostrar rotas existentes
         st.markdown("#### Rotas Configuradas")
         
-        routes_data = []
-        for source, destination in routes.items():
-            routes_data.append({
-                "Origem": str(source),
-                "Destino": str(destination),
-                "Status": "✅ Ativa"
-            })
-        
-        df_routes = pd.DataFrame(routes_data)
-        st.dataframe(df_routes, use_container_width=True)
+        df_routes = _routes_frame(tuple(routes.items()))
+        st.table(df_routes)
         
         # Remover rota
         st.markdown("#### ❌ Remover Rota")
-        route_to_remove = st.selectbox("Selecione a rota para remover", list(routes.keys()))
+        route_to_remove = st.selectbox(
+            "Selecione a rota para remover",
+            list(routes),
+            key="remove_route_sel"
+        )
         if st.button("Remover Rota Selecionada"):
             if manager.remove_route(route_to_remove):
                 st.success(f"✅ Rota {route_to_remove} removida com sucesso!")
@@ -326,140 +500,44 @@ with tab2:
     # Adicionar nova rota
     st.markdown("#### ➕ Adicionar Nova Rota")
     
-    with st.form("add_route_form"):
-        col1, col2 = st.columns(2)
-        
-        with col1:
-            source = st.text_input("Origem (ID ou @username)", placeholder="@meu_canal ou 123456789")
-        
-        with col2:
-            destination = st.text_input("Destino", placeholder="me ou ID do chat")
-        
-        submitted = st.form_submit_button("Adicionar Rota")
-        
-        if submitted and source and destination:
-            if manager.add_route(source, destination):
-                st.success(f"✅ Rota {source} → {destination} adicionada com sucesso!")
-                st.rerun()
-            else:
-                st.error("❌ Erro ao adicionar rota")
+    render_add_route_form("tab")
 
 with tab3:
     # Configuração de filtros
     st.markdown("### ⚙️ Configuração de Filtros")
     
-    manager.reload_config()
-    current_filters = manager.config.filters
-    
     st.markdown("#### 🎯 Filtros de Conteúdo")
     
-    col1, col2 = st.columns(2)
-    
-    with col1:
-        media_only = st.checkbox("Apenas Mídia", value=current_filters.media_only)
-        photos = st.checkbox("Incluir Fotos", value=current_filters.photos)
-    
-    with col2:
-        videos = st.checkbox("Incluir Vídeos", value=current_filters.videos)
-        documents = st.checkbox("Incluir Documentos", value=current_filters.documents)
-    
-    if st.button("💾 Salvar Configuração de Filtros"):
-        if manager.update_filters(
-            media_only=media_only,
-            photos=photos,
-            videos=videos,
-            documents=documents
-        ):
-            st.success("✅ Configuração de filtros salva com sucesso!")
-            st.rerun()
-        else:
-            st.error("❌ Erro ao salvar configuração")
+    render_filters_form("tab")
     
     # Visualização da configuração
     st.markdown("#### 📋 Visualização da Configuração")
     
-    config_view = {
-        "rotas": routes,
-        "filtros": current_filters.dict()
-    }
-    
-    st.json(config_view)
+    with st.expander("Visualização JSON", expanded=False):
+        st.json(_config_json(tuple(routes.items()), tuple(current_filters.model_dump().items())))
 
 with tab4:
     # Logs e status
     st.markdown("### 📋 Logs e Status do Sistema")
-    
-    st.markdown("#### 📝 Logs do Serviço")
-    
-    if os.path.exists("telegram_backup.log"):
-        with open("telegram_backup.log", "r") as f:
-            # Read last 20 lines
-            lines = f.readlines()
-            last_logs = lines[-20:]
-
-        log_container = st.container()
-        with log_container:
-            for log in last_logs:
-                st.text(log.strip())
-    else:
-        st.info("Nenhum arquivo de log encontrado.")
-    
-    # Status do sistema
-    st.markdown("#### 🔍 Status Detalhado")
-    
-    status_data = {
-        "Componente": ["Service Runner", "Conexão DB"],
-        "Status": [
-            "✅ Ativo" if service_status else "🔴 Parado",
-            "✅ Conectado"
-        ],
-        "Última Verificação": [datetime.now().strftime("%H:%M:%S")] * 2
-    }
-    
-    df_status = pd.DataFrame(status_data)
-    st.dataframe(df_status, use_container_width=True)
-
-# Modais e formulários adicionais
-if st.session_state.get('show_add_route', False):
-    with st.form("modal_add_route"):
-        st.markdown("### ➕ Adicionar Nova Rota")
-        source = st.text_input("Origem (ID ou @username)")
-        destination = st.text_input("Destino")
-        
-        col1, col2 = st.columns(2)
-        with col1:
-            if st.form_submit_button("Adicionar"):
-                if manager.add_route(source, destination):
-                    st.success("✅ Rota adicionada!")
-                    st.session_state.show_add_route = False
-                    st.rerun()
-        with col2:
-            if st.button("Cancelar"):
-                st.session_state.show_add_route = False
-                st.rerun()
+    logs_fragment()
 
-if st.session_state.get('show_filters', False):
-    with st.form("modal_filters"):
-        st.markdown("### ⚙️ Configurar Filtros")
-        
-        manager.reload_config()
-        current_filters = manager.config.filters
-        
-        media_only = st.checkbox("Apenas Mídia", value=current_filters.media_only)
-        photos = st.checkbox("Incluir Fotos", value=current_filters.photos)
-        videos = st.checkbox("Incluir Vídeos", value=current_filters.videos)
-        
-        col1, col2 = st.columns(2)
-        with col1:
-            if st.form_submit_button("Salvar"):
-                if manager.update_filters(media_only=media_only, photos=photos, videos=videos):
-                    st.success("✅ Filtros atualizados!")
-                    st.session_state.show_filters = False
-                    st.rerun()
-        with col2:
-            if st.button("Cancelar"):
-                st.session_state.show_filters = False
-                st.rerun()
+# Modais
+def _render_add_route_modal():
+    st.markdown("### ➕ Adicionar Nova Rota")
+    render_add_route_form("modal", on_close=_close_modal)
+
+def _render_filters_modal():
+    st.markdown("### ⚙️ Configurar Filtros")
+    render_filters_form("modal", on_close=_close_modal)
+
+MODALS = {
+    "add_route": _render_add_route_modal,
+    "filters": _render_filters_modal,
+}
+
+render_modal = MODALS.get(st.session_state.get("active_modal"))
+if render_modal:
+    render_modal()
 
 # Footer
 st.markdown("---")
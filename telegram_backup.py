@@ -4,19 +4,28 @@ Sistema profissional de backup para Telegram com interface web e CLI
 """
 
 import asyncio
+import collections
+import contextlib
 import os
 import logging
+import sys
+import time
 from datetime import datetime, timezone
+from functools import lru_cache
 from pathlib import Path
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Union
 
 from dotenv import load_dotenv
-from telethon import TelegramClient, events
-from telethon.tl.types import Message
-from telethon.errors import SessionPasswordNeededError, PhoneCodeInvalidError, FloodWaitError, RPCError
+from telethon import TelegramClient, events, helpers, utils
+from telethon.tl.functions.messages import ForwardMessagesRequest
+from telethon.tl.types import Message, MessageMediaDocument, MessageMediaPhoto
+from telethon.errors import (
+    SessionPasswordNeededError, PhoneCodeInvalidError, FloodWaitError, RPCError,
+    MessageIdInvalidError, MessageIdsEmptyError, MediaEmptyError
+)
 
 # Importar modelos e banco de dados
-from models import BackupConfig, BackupStats
+from models import BackupConfig, BackupFilters, BackupStats
 from database import DatabaseManager
 
 # Configuração de logging
@@ -33,6 +42,58 @@ logger = logging.getLogger(__name__)
 # Carregar variáveis de ambiente
 load_dotenv()
 
+# Apelidos aceitos para "Mensagens Salvas" da própria conta
+_ME_ALIASES = frozenset(("me", "self", "saved"))
+
+# Máximo de atualizações de estado gravadas por ida à thread do banco
+STATE_WRITE_BATCH = 100
+
+# Limite do Telegram de mensagens por ForwardMessagesRequest
+FORWARD_BATCH_MAX = 100
+
+# Erros causados por mensagens específicas do lote; só eles justificam dividir o lote
+_MESSAGE_ERRORS = (MessageIdInvalidError, MessageIdsEmptyError, MediaEmptyError)
+
+# Tipos de mídia que carregam arquivo; as demais mídias contam como mensagem de texto
+_FILE_MEDIA = (MessageMediaPhoto, MessageMediaDocument)
+
+# Mensagens em tempo real aguardando envio, por fila; cheia, o handler espera
+LIVE_QUEUE_SIZE = 1024
+
+# Intervalo (s) do resumo de envios em tempo real, no lugar de uma linha de log por lote
+LOG_SUMMARY_INTERVAL = 10.0
+
+@lru_cache(maxsize=1024)
+def _coerce_entity_id(entity_id: str) -> Union[int, str]:
+    """IDs numéricos viram int; usernames/links ficam como str (memoizado)"""
+    try:
+        return int(entity_id)
+    except ValueError:
+        return entity_id
+
+class TokenBucket:
+    """Limitador token-bucket: `rate` envios por segundo, com rajadas de até `capacity`"""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity or max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        # Criado no primeiro uso, dentro do event loop que vai consumi-lo
+        self._lock: Optional[asyncio.Lock] = None
+
+    async def acquire(self, tokens: int = 1):
+        """Consome `tokens`; lotes maiores que a capacidade ficam em débito e aguardam a reposição"""
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= tokens
+            if self._tokens < 0:
+                await asyncio.sleep(-self._tokens / self.rate)
+
 class TelegramBackupManager:
     """Gerenciador principal do sistema de backup"""
     
@@ -46,10 +107,28 @@ class TelegramBackupManager:
         
         self.client = None
         self.db = DatabaseManager()
-        self.config = self.db.load_config()
+        self._limiter: Optional[TokenBucket] = None
+        self.reload_config()
         self.stats = BackupStats()
+        self._stats_token = None
         self.active_routes = {}
         self.is_running = False
+        self._state_queue: Optional[asyncio.Queue] = None
+        self._state_writer: Optional[asyncio.Task] = None
+        self._entity_cache: Dict[str, Any] = {}
+        self._peer_cache: Dict[str, Any] = {}
+        # chat_id (formato de event.chat_id) → InputPeers da origem e do destino, usados no caminho quente
+        self._route_source_peers: Dict[int, Any] = {}
+        self._route_dest_peers: Dict[int, Any] = {}
+        # chat_id → chave da origem em backup_state (o id sem marcação, como no backfill)
+        self._route_state_keys: Dict[int, str] = {}
+        # Último id processado por origem; carregado do banco uma vez por execução
+        self._last_ids: Optional[Dict[str, int]] = None
+        self._message_handler = None
+        self._live_queues: List[asyncio.Queue] = []
+        self._live_workers: List[asyncio.Task] = []
+        # Mensagens encaminhadas por chat desde o último resumo
+        self._forward_counts: collections.Counter = collections.Counter()
 
         # Ensure directories exist
         Path("logs").mkdir(exist_ok=True)
@@ -58,90 +137,139 @@ class TelegramBackupManager:
     def reload_config(self):
         """Reload configuration from DB"""
         self.config = self.db.load_config()
+        self._config_version = self.db.data_version()
+        # Retrato do que está gravado, para save_config detectar quando não há o que gravar
+        self._saved_config = self.config.model_dump()
+        self._predicate = self._compile_predicate()
+        self._update_limiter()
+
+    def _update_limiter(self):
+        """Recria o token bucket só quando a taxa configurada muda (None = sem limite)"""
+        rate_limit = self.config.settings.rate_limit
+        rate = rate_limit.messages_per_second if rate_limit.enabled else None
+        if rate != (self._limiter.rate if self._limiter else None):
+            self._limiter = TokenBucket(rate) if rate else None
+
+    def load_config(self) -> BackupConfig:
+        """Retorna a configuração em memória, relendo o banco só se outro processo o alterou"""
+        if self.db.data_version() != self._config_version:
+            self.reload_config()
+        return self.config
+
+    def save_config(self) -> bool:
+        """Persiste a configuração em memória no banco"""
+        try:
+            # Nada a gravar se o cache não divergiu do último estado gravado
+            snapshot = self.config.model_dump()
+            if snapshot == self._saved_config:
+                return True
+            self.db.save_config(self.config)
+            self._saved_config = snapshot
+            logger.info("Configuração salva")
+            return True
+        except Exception as e:
+            logger.error("Erro ao salvar configuração: %s", e)
+            return False
 
     def add_route(self, source: str, destination: str) -> bool:
         """Adiciona uma nova rota de backup"""
         try:
             self.db.save_route(str(source), str(destination))
-            self.reload_config()
-            logger.info(f"Rota adicionada: {source} → {destination}")
+            self.config.routes[str(source)] = str(destination)
+            self._saved_config["routes"][str(source)] = str(destination)
+            logger.info("Rota adicionada: %s → %s", source, destination)
             return True
         except Exception as e:
-            logger.error(f"Erro ao adicionar rota: {e}")
+            logger.error("Erro ao adicionar rota: %s", e)
             return False
 
     def remove_route(self, source: str) -> bool:
         """Remove uma rota de backup"""
         try:
             self.db.remove_route(str(source))
-            self.reload_config()
-            logger.info(f"Rota removida: {source}")
+            self.config.routes.pop(str(source), None)
+            self._saved_config["routes"].pop(str(source), None)
+            logger.info("Rota removida: %s", source)
             return True
         except Exception as e:
-            logger.error(f"Erro ao remover rota: {e}")
+            logger.error("Erro ao remover rota: %s", e)
             return False
 
     def update_filters(self, **filters) -> bool:
         """Atualiza filtros de backup"""
         try:
-            self.db.update_filters(filters)
-            self.reload_config()
-            logger.info(f"Filtros atualizados: {filters}")
+            # Chave desconhecida é rejeitada antes de qualquer escrita no banco
+            unknown = set(filters) - set(BackupFilters.model_fields)
+            if unknown:
+                raise ValueError(f"Filtros desconhecidos: {', '.join(sorted(unknown))}")
+            # Só grava e recompila o predicado se algum valor mudou de fato
+            changed = {
+                key: bool(value) for key, value in filters.items()
+                if self._saved_config["filters"].get(key) != bool(value)
+            }
+            if not changed:
+                return True
+            self.db.update_filters(changed)
+            for key, value in changed.items():
+                setattr(self.config.filters, key, value)
+                self._saved_config["filters"][key] = value
+            self._predicate = self._compile_predicate()
+            logger.info("Filtros atualizados: %s", changed)
             return True
         except Exception as e:
-            logger.error(f"Erro ao atualizar filtros: {e}")
+            logger.error("Erro ao atualizar filtros: %s", e)
             return False
 
     def get_stats(self) -> BackupStats:
         """Retorna estatísticas atualizadas"""
         try:
-            state = self.db.get_state()
-            self.stats.processed_messages = len(state) # Number of tracked chats
+            # Contadores só são relidos quando houve commit no banco (deste ou de outro processo);
+            # entre commits, os envios deste processo já os atualizam em memória
+            token = self.db.change_token()
+            if token != self._stats_token:
+                self.stats.processed_messages = self.db.get_total_processed_messages()
+                self.stats.last_message_id = self.db.get_max_message_id()
+                self.stats.last_update = datetime.now(timezone.utc)
+                self._stats_token = token
             self.stats.total_routes = len(self.config.routes)
             self.stats.active_routes = len(self.active_routes)
-            self.stats.last_update = datetime.now()
-            
-            if state:
-                self.stats.last_message_id = max(state.values())
             
             return self.stats
         except Exception as e:
-            logger.error(f"Erro ao obter estatísticas: {e}")
+            logger.error("Erro ao obter estatísticas: %s", e)
             return self.stats
 
-    def should_backup_message(self, message: Message) -> bool:
-        """Verifica se uma mensagem deve ser backupada"""
-        try:
-            if message.action:
-                return False
-            
-            filters = self.config.filters
+    def _compile_predicate(self):
+        """Monta o filtro de mensagens com os valores atuais de config.filters"""
+        filters = self.config.filters
+        # Decisões que não dependem da mensagem são tomadas uma vez aqui
+        text_ok = filters.text_messages and not filters.media_only
+        # Só os tipos de mídia habilitados são testados; photo/video/document são None
+        # quando o arquivo não é desse tipo
+        media_attrs = tuple(attr for attr, enabled in (
+            ("photo", filters.photos),
+            ("video", filters.videos),
+            ("document", filters.documents),
+        ) if enabled)
 
-            # Se não há filtros ativos (ou todos falsos que bloqueariam tudo?),
-            # assumimos padrão de backup se a lógica anterior era "not any -> true".
-            # No entanto, com Pydantic defaults, temos valores booleanos definidos.
-            # Vamos seguir a lógica: se media_only é true, e não tem media, retorna false.
-            
-            if filters.media_only and not message.media:
+        def predicate(message: Message) -> bool:
+            if message.action:
                 return False
-            
-            if message.media:
-                if hasattr(message, 'photo') and filters.photos:
+            # Só foto e documento são arquivos; prévia de link (MessageMediaWebPage), enquete,
+            # localização etc. acompanham texto. Message.photo também devolveria a foto da prévia
+            if not isinstance(message.media, _FILE_MEDIA):
+                return text_ok
+            for attr in media_attrs:
+                if getattr(message, attr) is not None:
                     return True
-                if hasattr(message, 'video') and filters.videos:
-                    return True
-                if hasattr(message, 'document') and filters.documents:
-                    return True
-                # Se tem media mas nenhum filtro específico ativo, retorna False?
-                # A lógica original era: se media, verifica tipos.
-                return False
-            
-            return filters.text_messages
-        
-        except Exception as e:
-            logger.error(f"Erro ao verificar mensagem: {e}")
             return False
 
+        return predicate
+
+    def should_backup_message(self, message: Message) -> bool:
+        """Verifica se uma mensagem deve ser backupada"""
+        return self._predicate(message)
+
     async def connect(self) -> bool:
         """Conecta ao Telegram"""
         try:
@@ -155,11 +283,13 @@ class TelegramBackupManager:
             logger.info("Conectado ao Telegram com sucesso")
             return True
         except Exception as e:
-            logger.error(f"Erro ao conectar ao Telegram: {e}")
+            logger.error("Erro ao conectar ao Telegram: %s", e)
             return False
 
     async def disconnect(self):
         """Desconecta do Telegram"""
+        await self._stop_live_workers()
+        await self._stop_state_writer()
         if self.client:
             await self.client.disconnect()
             logger.info("Desconectado do Telegram")
@@ -170,18 +300,39 @@ class TelegramBackupManager:
             if not self.client:
                 await self.connect()
             
-            if str(entity_id).lower() in ["me", "self", "saved"]:
+            key = str(entity_id).lower()
+            if key in _ME_ALIASES:
                 return "me"
             
-            try:
-                entity_id = int(entity_id)
-            except (ValueError, TypeError):
-                pass
-            
-            entity = await self.client.get_entity(entity_id)
+            # Entidades já resolvidas nesta execução não voltam ao Telegram
+            entity = self._entity_cache.get(key)
+            if entity is None:
+                entity = await self.client.get_entity(_coerce_entity_id(str(entity_id)))
+                self._entity_cache[key] = entity
             return entity
         except Exception as e:
-            logger.error(f"Erro ao resolver entidade {entity_id}: {e}")
+            logger.error("Erro ao resolver entidade %s: %s", entity_id, e)
+            return None
+
+    async def resolve_input_peer(self, entity_id: str):
+        """Resolve uma rota direto para InputPeer, sem buscar a entidade completa.
+
+        get_input_entity consulta primeiro as entidades salvas na sessão do
+        Telethon (SQLite, com access_hash), então reinícios não voltam à API.
+        """
+        try:
+            if not self.client:
+                await self.connect()
+            
+            key = str(entity_id).lower()
+            peer = self._peer_cache.get(key)
+            if peer is None:
+                target = "me" if key in _ME_ALIASES else _coerce_entity_id(str(entity_id))
+                peer = await self.client.get_input_entity(target)
+                self._peer_cache[key] = peer
+            return peer
+        except Exception as e:
+            logger.error("Erro ao resolver entidade %s: %s", entity_id, e)
             return None
 
     def get_entity_display_name(self, entity) -> str:
@@ -203,46 +354,226 @@ class TelegramBackupManager:
         except Exception:
             return "entidade_desconhecida"
 
-    async def backup_historical_messages(self, source_entity, destination_entity) -> int:
-        """Faz backup de mensagens históricas de um chat"""
+    def _start_state_writer(self):
+        """Inicia a tarefa que grava o estado no SQLite fora do event loop"""
+        if self._state_writer is None:
+            self._state_queue = asyncio.Queue()
+            self._state_writer = asyncio.create_task(self._state_writer_loop())
+
+    def _queue_state(self, entity_id: str, message_id: int):
+        self._state_queue.put_nowait((entity_id, message_id))
+
+    async def _state_writer_loop(self):
+        while True:
+            batch = [await self._state_queue.get()]
+            while len(batch) < STATE_WRITE_BATCH and not self._state_queue.empty():
+                batch.append(self._state_queue.get_nowait())
+            # None é o sinal de parada de _stop_state_writer, sempre o último da fila
+            stop = batch[-1] is None
+            if stop:
+                batch.pop()
+            if batch:
+                await asyncio.get_running_loop().run_in_executor(None, self._write_state_batch, batch)
+            if stop:
+                return
+
+    def _write_state_batch(self, batch):
+        self.db.update_state_bulk(batch)
+
+    async def _stop_state_writer(self):
+        """Para a tarefa de gravação e persiste o que ainda estiver na fila"""
+        if self._state_writer is None:
+            return
+
+        # Parar pela fila em vez de cancel(): cancelar a espera do executor descartaria
+        # um lote ainda não iniciado na thread
+        self._state_queue.put_nowait(None)
+        with contextlib.suppress(asyncio.CancelledError):
+            await self._state_writer
+        self._state_writer = None
+
+        # run_in_executor em vez de asyncio.to_thread, que não existe no Python 3.8
+        loop = asyncio.get_running_loop()
+        pending = []
+        while not self._state_queue.empty():
+            item = self._state_queue.get_nowait()
+            if item is not None:
+                pending.append(item)
+        if pending:
+            await loop.run_in_executor(None, self._write_state_batch, pending)
+        await loop.run_in_executor(None, self.db.flush)
+
+    async def _forward_batch(self, source_peer, destination_peer, source_id: str, batch: List[Message]) -> int:
+        """Encaminha um lote de mensagens numa única requisição; retorna quantas foram enviadas
+
+        Os peers já chegam resolvidos como InputPeer, então a requisição vai direto,
+        sem a resolução e validação que `client.forward_messages` refaz a cada chamada.
+        """
+        sent = await self._send_batch(source_peer, destination_peer, batch)
+        if not sent:
+            return 0
+
+        for message in sent:
+            self._queue_state(source_id, message.id)
+        self._last_ids[source_id] = sent[-1].id
+        self.stats.processed_messages += len(sent)
+        self.stats.last_message_id = max(self.stats.last_message_id, sent[-1].id)
+        return len(sent)
+
+    async def _send_batch(self, source_peer, destination_peer, batch: List[Message]) -> List[Message]:
+        """Envia o lote e devolve as mensagens encaminhadas
+
+        Erros de mensagens específicas dividem o lote ao meio até isolar as culpadas;
+        qualquer outro erro (destino inválido, sem permissão, conexão) descarta o lote de uma vez.
+        """
+        request = ForwardMessagesRequest(
+            from_peer=source_peer,
+            id=[message.id for message in batch],
+            random_id=[helpers.generate_random_long() for _ in batch],
+            to_peer=destination_peer,
+            silent=True,
+            background=True
+        )
+        while True:
+            # Cada requisição efetivamente enviada (reenvios e metades inclusive) paga seus tokens
+            if self._limiter:
+                await self._limiter.acquire(len(batch))
+            try:
+                await self.client(request)
+                return batch
+            except FloodWaitError as e:
+                # O mesmo lote é reenviado depois da espera, sem perder mensagens
+                logger.warning("FloodWait detectado. Aguardando %s segundos.", e.seconds)
+                await asyncio.sleep(e.seconds)
+            except _MESSAGE_ERRORS as e:
+                error = e
+                break
+            except RPCError as e:
+                logger.error("Erro RPC do Telegram nas mensagens %s-%s: %s", batch[0].id, batch[-1].id, e)
+                self.stats.errors_count += len(batch)
+                return []
+            except Exception as e:
+                logger.error("Erro inesperado ao encaminhar mensagens %s-%s: %s", batch[0].id, batch[-1].id, e)
+                self.stats.errors_count += len(batch)
+                return []
+
+        if len(batch) == 1:
+            logger.error("Erro RPC do Telegram na mensagem %s: %s", batch[0].id, error)
+            self.stats.errors_count += 1
+            return []
+
+        # Uma mensagem impossível de encaminhar não pode derrubar o lote inteiro: as seguintes
+        # avançam o estado, e o min_id da próxima execução nunca mais voltaria a elas
+        logger.warning(
+            "Falha ao encaminhar mensagens %s-%s (%s); reenviando em partes",
+            batch[0].id, batch[-1].id, error
+        )
+        middle = len(batch) // 2
+        first = await self._send_batch(source_peer, destination_peer, batch[:middle])
+        return first + await self._send_batch(source_peer, destination_peer, batch[middle:])
+
+    def _start_live_workers(self, count: int):
+        """Inicia as tarefas que encaminham as mensagens recebidas em tempo real"""
+        if not self._live_workers:
+            self._live_queues = [asyncio.Queue(maxsize=LIVE_QUEUE_SIZE) for _ in range(count)]
+            self._live_workers = [asyncio.create_task(self._live_worker(q)) for q in self._live_queues]
+            self._live_workers.append(asyncio.create_task(self._log_summary_loop()))
+
+    async def _live_worker(self, queue: asyncio.Queue):
+        while True:
+            items = [await queue.get()]
+            batch_size = min(self.config.settings.batch_size, FORWARD_BATCH_MAX)
+            while len(items) < batch_size and not queue.empty():
+                items.append(queue.get_nowait())
+            
+            # Mensagens que chegaram juntas do mesmo chat seguem numa única requisição
+            by_chat: Dict[int, List[Message]] = {}
+            for chat_id, message in items:
+                by_chat.setdefault(chat_id, []).append(message)
+            try:
+                for chat_id, messages in by_chat.items():
+                    # Uma falha inesperada perde só este lote: se o worker morresse, a fila dele
+                    # enchendo travaria o dispatch de updates do Telethon no put() do handler
+                    try:
+                        sent = await self._forward_batch(
+                            self._route_source_peers[chat_id], self._route_dest_peers[chat_id],
+                            self._route_state_keys[chat_id], messages
+                        )
+                        self._forward_counts[chat_id] += sent
+                    except Exception as e:
+                        logger.error("Erro no worker de tempo real (chat %s): %s", chat_id, e, exc_info=True)
+                        self.stats.errors_count += len(messages)
+            finally:
+                for _ in items:
+                    queue.task_done()
+
+    async def _log_summary_loop(self):
+        """Registra uma linha por intervalo com o volume encaminhado, só quando houve envios"""
+        while True:
+            await asyncio.sleep(LOG_SUMMARY_INTERVAL)
+            if self._forward_counts:
+                total = sum(self._forward_counts.values())
+                logger.info(
+                    "Tempo real: %s mensagens (%.1f/s) de %s chats nos últimos %ss",
+                    total, total / LOG_SUMMARY_INTERVAL, len(self._forward_counts), LOG_SUMMARY_INTERVAL
+                )
+                logger.debug("Envios por chat: %s", dict(self._forward_counts))
+                self._forward_counts.clear()
+
+    async def _stop_live_workers(self):
+        """Cancela os workers; o que ficou na fila é recuperado pelo backfill da próxima execução"""
+        for task in self._live_workers:
+            task.cancel()
+        for task in self._live_workers:
+            with contextlib.suppress(asyncio.CancelledError):
+                await task
+        self._live_workers = []
+        self._live_queues = []
+
+    async def backup_historical_messages(self, source_peer, destination_peer) -> int:
+        """Faz backup de mensagens históricas de um chat (origem e destino: InputPeers já resolvidos)"""
         try:
-            state = self.db.get_state()
-            source_id = str(source_entity.id)
-            last_id = state.get(source_id, 0)
+            if self._last_ids is None:
+                self._last_ids = self.db.get_state()
+            source_id = str(utils.get_peer_id(source_peer, add_mark=False))
+            last_id = self._last_ids.get(source_id, 0)
             
-            logger.info(f"Iniciando backup histórico de {source_id} (último ID: {last_id})")
+            logger.info("Iniciando backup histórico de %s (último ID: %s)", source_id, last_id)
             
+            batch_size = min(self.config.settings.batch_size, FORWARD_BATCH_MAX)
             count = 0
+            pending: List[Message] = []
+            # Um lote em envio enquanto o iterador busca o próximo; lotes da mesma rota
+            # continuam saindo em ordem, pois cada um só parte depois do anterior
+            in_flight: Optional[asyncio.Task] = None
+            # Sem limite, o Telethon dorme 1s entre páginas de histórico; o ritmo aqui
+            # já é dado pelo token bucket dos envios
             async for message in self.client.iter_messages(
-                source_entity, 
+                source_peer, 
                 min_id=last_id, 
-                reverse=True
+                reverse=True,
+                wait_time=0
             ):
-                if self.should_backup_message(message):
-                    try:
-                        await self.client.forward_messages(destination_entity, message)
-                        self.db.update_state(source_id, message.id)
-                        count += 1
-                        
-                        # Respeitar rate limit
-                        if self.config.settings.rate_limit.enabled:
-                             await asyncio.sleep(1.0 / self.config.settings.rate_limit.messages_per_second)
-                    
-                    except FloodWaitError as e:
-                        logger.warning(f"FloodWait detectado. Aguardando {e.seconds} segundos.")
-                        await asyncio.sleep(e.seconds)
-                    except RPCError as e:
-                        logger.error(f"Erro RPC do Telegram na mensagem {message.id}: {e}")
-                        self.stats.errors_count += 1
-                    except Exception as e:
-                        logger.error(f"Erro inesperado ao encaminhar mensagem {message.id}: {e}")
-                        self.stats.errors_count += 1
+                if self._predicate(message):
+                    pending.append(message)
+                    if len(pending) >= batch_size:
+                        if in_flight:
+                            count += await in_flight
+                        in_flight = asyncio.create_task(
+                            self._forward_batch(source_peer, destination_peer, source_id, pending)
+                        )
+                        pending = []
             
-            logger.info(f"Backup histórico concluído: {count} mensagens de {source_id}")
+            if in_flight:
+                count += await in_flight
+            if pending:
+                count += await self._forward_batch(source_peer, destination_peer, source_id, pending)
+            
+            logger.info("Backup histórico concluído: %s mensagens de %s", count, source_id)
             return count
         
         except Exception as e:
-            logger.error(f"Erro no backup histórico: {e}")
+            logger.error("Erro no backup histórico: %s", e)
             return 0
 
     async def start_real_time_backup(self):
@@ -250,58 +581,66 @@ class TelegramBackupManager:
         try:
             self.reload_config()
             self.active_routes = {}
+            self._route_source_peers = {}
+            self._route_dest_peers = {}
+            self._route_state_keys = {}
+            self._last_ids = self.db.get_state()
+            resolved = []
             
             for source, destination in self.config.routes.items():
-                source_entity = await self.resolve_entity(source)
-                dest_entity = await self.resolve_entity(destination)
+                source_peer = await self.resolve_input_peer(source)
+                dest_peer = await self.resolve_input_peer(destination)
                 
-                if source_entity and dest_entity:
-                    self.active_routes[source_entity.id] = dest_entity
-                    logger.info(f"Rota ativa: {self.get_entity_display_name(source_entity)} → {self.get_entity_display_name(dest_entity)}")
+                if source_peer and dest_peer:
+                    chat_id = utils.get_peer_id(source_peer)
+                    self.active_routes[chat_id] = dest_peer
+                    self._route_source_peers[chat_id] = source_peer
+                    self._route_dest_peers[chat_id] = dest_peer
+                    self._route_state_keys[chat_id] = str(utils.get_peer_id(source_peer, add_mark=False))
+                    resolved.append((source_peer, dest_peer))
+                    logger.info("Rota ativa: %s → %s", source, destination)
             
             if not self.active_routes:
                 logger.warning("Nenhuma rota válida encontrada")
                 return False
             
+            self._start_state_writer()
+            # Contador mantido em memória a partir daqui; o banco é lido uma única vez
+            self.stats.processed_messages = self.db.get_total_processed_messages()
+
             logger.info("Iniciando backup histórico...")
-            for source_entity, dest_entity in self.active_routes.items():
-                await self.backup_historical_messages(source_entity, dest_entity)
+            # Rotas são chats independentes: o backfill roda em paralelo, limitado a max_workers
+            workers = asyncio.Semaphore(self.config.settings.max_workers)
+            
+            async def backfill(source_peer, dest_peer):
+                async with workers:
+                    return await self.backup_historical_messages(source_peer, dest_peer)
+            
+            await asyncio.gather(*(backfill(*route) for route in resolved))
+            
+            # O filtro de chats fica no dispatcher do Telethon: só chegam eventos das rotas ativas
+            if self._message_handler is not None:
+                self.client.remove_event_handler(self._message_handler)
+            
+            # Cada chat cai sempre na mesma fila, então a ordem por chat é preservada
+            self._start_live_workers(self.config.settings.max_workers)
             
-            @self.client.on(events.NewMessage)
+            # Escuta só os chats de origem; os InputPeers já resolvidos evitam nova busca de entidade
+            @self.client.on(events.NewMessage(chats=list(self._route_source_peers.values())))
             async def handle_new_message(event):
-                chat_id = event.chat_id
-                
-                if chat_id in self.active_routes:
-                    message = event.message
-                    
-                    if self.should_backup_message(message):
-                        try:
-                            await self.client.forward_messages(
-                                self.active_routes[chat_id], 
-                                message
-                            )
-                            
-                            self.db.update_state(str(chat_id), message.id)
-                            self.stats.processed_messages = self.db.get_total_processed_messages()
-                            
-                            logger.debug(f"Mensagem {message.id} backupada do chat {chat_id}")
-                        
-                        except FloodWaitError as e:
-                            logger.warning(f"FloodWait detectado em tempo real. Aguardando {e.seconds} segundos.")
-                            await asyncio.sleep(e.seconds)
-                        except RPCError as e:
-                            logger.error(f"Erro RPC em tempo real: {e}")
-                            self.stats.errors_count += 1
-                        except Exception as e:
-                            logger.error(f"Erro inesperado em tempo real: {e}")
-                            self.stats.errors_count += 1
+                message = event.message
+                if self._predicate(message):
+                    queues = self._live_queues
+                    await queues[event.chat_id % len(queues)].put((event.chat_id, message))
+            
+            self._message_handler = handle_new_message
             
             self.is_running = True
             logger.info("Backup em tempo real iniciado com sucesso")
             return True
         
         except Exception as e:
-            logger.error(f"Erro ao iniciar backup em tempo real: {e}")
+            logger.error("Erro ao iniciar backup em tempo real: %s", e)
             return False
 
     async def run_backup_service(self):
@@ -311,7 +650,7 @@ class TelegramBackupManager:
                 return False
             
             me = await self.client.get_me()
-            logger.info(f"Conectado como: {self.get_entity_display_name(me)}")
+            logger.info("Conectado como: %s", self.get_entity_display_name(me))
             
             if await self.start_real_time_backup():
                 logger.info("Serviço iniciado. Aguardando mensagens...")
@@ -320,11 +659,12 @@ class TelegramBackupManager:
             return True
         
         except Exception as e:
-            logger.error(f"Erro ao executar serviço: {e}")
+            logger.error("Erro ao executar serviço: %s", e)
             return False
         
         finally:
             await self.disconnect()
+            self.db.flush()
             self.is_running = False
 
 def create_backup_manager() -> TelegramBackupManager:
@@ -338,10 +678,25 @@ async def run_async_backup():
         manager = create_backup_manager()
         await manager.run_backup_service()
     except Exception as e:
-        logger.error(f"Erro fatal: {e}")
+        logger.error("Erro fatal: %s", e)
+
+def run_event_loop(coro) -> None:
+    """Run a coroutine on uvloop when available, else the default loop"""
+    try:
+        import uvloop
+    except ImportError:
+        asyncio.run(coro)
+        return
+
+    if sys.version_info >= (3, 11):
+        with asyncio.Runner(loop_factory=uvloop.new_event_loop) as runner:
+            runner.run(coro)
+    else:
+        uvloop.install()
+        asyncio.run(coro)
 
 def run_backup():
-    asyncio.run(run_async_backup())
+    run_event_loop(run_async_backup())
 
 if __name__ == "__main__":
     run_backup()
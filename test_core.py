@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+Testes focados do núcleo de backup
+Filtro de mensagens, estado em buffer no SQLite, token bucket e divisão de lotes
+"""
+
+import asyncio
+import sqlite3
+import time
+from types import SimpleNamespace
+
+import pytest
+from telethon.errors import ChatWriteForbiddenError, MessageIdInvalidError
+from telethon.tl import types
+
+import database
+import telegram_backup
+from database import DatabaseManager, STATE_FLUSH_EVERY, STATE_FLUSH_INTERVAL
+from telegram_backup import TelegramBackupManager, TokenBucket
+
+SOURCE = types.InputPeerChannel(42, 0)
+DESTINATION = types.InputPeerChannel(7, 0)
+
+@pytest.fixture
+def manager(tmp_path, monkeypatch):
+    """Gerenciador com banco isolado em tmp_path (backup.db é relativo ao diretório atual)"""
+    monkeypatch.chdir(tmp_path)
+    return TelegramBackupManager(api_id=1, api_hash="x" * 32)
+
+def make_message(message_id=1, media=None, photo=None, video=None, document=None, action=None):
+    return SimpleNamespace(
+        id=message_id, media=media, photo=photo, video=video, document=document, action=action
+    )
+
+def web_preview():
+    # Message.photo devolve a foto da prévia, então o predicado não pode confiar nele
+    media = types.MessageMediaWebPage(webpage=types.WebPageEmpty(id=1))
+    return make_message(media=media, photo=object())
+
+# --- Filtro de mensagens ---
+
+def test_web_preview_is_text(manager):
+    """Prévia de link segue o filtro de texto, não o de fotos"""
+    assert manager.should_backup_message(web_preview())
+
+    manager.update_filters(text_messages=False)
+    assert not manager.should_backup_message(web_preview())
+
+def test_web_preview_excluded_when_media_only(manager):
+    manager.update_filters(media_only=True)
+    assert not manager.should_backup_message(web_preview())
+
+def test_file_media_uses_type_filters(manager):
+    photo = make_message(media=types.MessageMediaPhoto(), photo=object())
+    document = make_message(media=types.MessageMediaDocument(), document=object())
+
+    manager.update_filters(media_only=True, photos=True, documents=False)
+    assert manager.should_backup_message(photo)
+    assert not manager.should_backup_message(document)
+
+def test_service_messages_are_skipped(manager):
+    assert not manager.should_backup_message(make_message(action=object()))
+
+# --- Estado em buffer ---
+
+def stored_state(db):
+    """Lê o que já está no disco, ignorando o buffer em memória"""
+    with sqlite3.connect(db.db_path) as conn:
+        return dict(conn.execute("SELECT entity_id, last_message_id FROM backup_state"))
+
+def test_state_flushes_after_threshold(tmp_path):
+    db = DatabaseManager(str(tmp_path / "state.db"))
+    db.update_state_bulk(("a", i) for i in range(1, STATE_FLUSH_EVERY))
+    assert stored_state(db) == {}
+    assert db.get_state() == {"a": STATE_FLUSH_EVERY - 1}
+
+    db.update_state("a", STATE_FLUSH_EVERY)
+    assert stored_state(db) == {"a": STATE_FLUSH_EVERY}
+
+def test_state_flushes_after_interval(tmp_path):
+    db = DatabaseManager(str(tmp_path / "state.db"))
+    db.update_state("a", 1)
+    assert stored_state(db) == {}
+
+    db._last_flush = time.monotonic() - STATE_FLUSH_INTERVAL
+    db.update_state("a", 2)
+    assert stored_state(db) == {"a": 2}
+
+def test_processed_counter_ignores_stale_ids(tmp_path):
+    db = DatabaseManager(str(tmp_path / "state.db"))
+    db.update_state_bulk(("a", i) for i in range(1, 11))
+    assert db.get_total_processed_messages() == 10
+    db.flush()
+    assert db.get_total_processed_messages() == 10
+
+    # Id repetido no buffer não conta; id antigo é descartado pelo upsert no flush
+    db.update_state("b", 3)
+    db.update_state("b", 3)
+    db.update_state("a", 5)
+    db.flush()
+    assert db.get_total_processed_messages() == 11
+    assert db.get_state() == {"a": 10, "b": 3}
+
+def test_flush_on_empty_buffer_keeps_counter(tmp_path):
+    db = DatabaseManager(str(tmp_path / "state.db"))
+    db.update_state("a", 1)
+    db.flush()
+    db.flush()
+    assert db.get_total_processed_messages() == 1
+
+# --- Token bucket ---
+
+def test_token_bucket_waits_for_debt(monkeypatch):
+    sleeps = []
+
+    async def fake_sleep(seconds):
+        sleeps.append(seconds)
+
+    monkeypatch.setattr(telegram_backup.asyncio, "sleep", fake_sleep)
+
+    async def run():
+        bucket = TokenBucket(rate=100)
+        await bucket.acquire(100)
+        assert sleeps == []
+        # Lote acima do saldo fica em débito e espera a reposição proporcional
+        await bucket.acquire(20)
+
+    asyncio.run(run())
+    assert len(sleeps) == 1
+    assert sleeps[0] == pytest.approx(0.2, abs=0.02)
+
+# --- Divisão de lotes ---
+
+class FakeLimiter:
+    def __init__(self):
+        self.acquired = []
+
+    async def acquire(self, tokens=1):
+        self.acquired.append(tokens)
+
+class FakeClient:
+    """Cliente que falha em mensagens específicas ou em todo envio"""
+
+    def __init__(self, bad_ids=(), error=None):
+        self.bad_ids = set(bad_ids)
+        self.error = error
+        self.calls = []
+
+    async def iter_messages(self, entity, min_id=0, reverse=True, **kwargs):
+        for message_id in range(min_id + 1, 21):
+            yield make_message(message_id)
+
+    async def __call__(self, request):
+        self.calls.append(list(request.id))
+        if self.bad_ids.intersection(request.id):
+            raise MessageIdInvalidError(None)
+        if self.error is not None:
+            raise self.error
+
+def run_historical(manager, client):
+    manager.config.settings.batch_size = 10
+    manager.client = client
+    manager._limiter = FakeLimiter()
+
+    async def run():
+        manager._start_state_writer()
+        count = await manager.backup_historical_messages(SOURCE, DESTINATION)
+        await manager._stop_state_writer()
+        return count
+
+    return asyncio.run(run())
+
+def test_message_error_splits_batch(manager):
+    client = FakeClient(bad_ids=(5, 20))
+    assert run_historical(manager, client) == 18
+    assert manager.stats.errors_count == 2
+    assert manager.db.get_state()["42"] == 19
+    # Cada requisição enviada, metades inclusive, paga seus tokens
+    assert manager._limiter.acquired == [len(ids) for ids in client.calls]
+
+def test_other_errors_drop_batch_without_splitting(manager):
+    client = FakeClient(error=ChatWriteForbiddenError(None))
+    assert run_historical(manager, client) == 0
+    assert manager.stats.errors_count == 20
+    assert len(client.calls) == 2
+    assert "42" not in manager.db.get_state()
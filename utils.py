@@ -4,14 +4,171 @@ Funções auxiliares para a interface Streamlit
 """
 
 import os
+import copy
+import html
 import json
-import asyncio
-from datetime import datetime
-from typing import Dict, List, Any, Optional
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import TYPE_CHECKING, Dict, List, Any, NamedTuple, Optional, Tuple
 from pathlib import Path
 
-import streamlit as st
-from telegram_backup import TelegramBackupManager, create_backup_manager
+# streamlit, numpy e o backend (Telethon) são importados só nas funções que os usam,
+# para que formatação e validação não paguem esse custo na importação do módulo
+if TYPE_CHECKING:
+    from telegram_backup import TelegramBackupManager
+
+try:
+    import orjson
+except ImportError:  # optional speedup, see the 'speedups' extra
+    orjson = None
+
+# json.loads também aceita bytes, então a leitura é sempre em modo binário
+json_loads = orjson.loads if orjson is not None else json.loads
+
+# Exportações com mais rotas que isso são gravadas em fluxo, sem montar o JSON inteiro na memória
+EXPORT_STREAM_MIN_ROUTES = 5000
+EXPORT_BUFFER_SIZE = 64 * 1024
+
+def _json_pretty(value: Any) -> bytes:
+    """JSON indentado com 2 espaços, em UTF-8"""
+    if orjson is not None:
+        return orjson.dumps(value, option=orjson.OPT_INDENT_2)
+    return json.dumps(value, ensure_ascii=False, indent=2).encode('utf-8')
+
+def _json_compact(value: Any) -> bytes:
+    """JSON compacto, em UTF-8"""
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(value, ensure_ascii=False).encode('utf-8')
+
+def _write_streamed_export(f, config: Dict[str, Any]):
+    """Grava `config` no mesmo layout de _json_pretty, emitindo as rotas uma a uma"""
+    f.write(b'{\n  "routes": {')
+    separator = b'\n    '
+    for source, destination in config["routes"].items():
+        f.write(separator + _json_compact(source) + b': ' + _json_compact(destination))
+        separator = b',\n    '
+    f.write(b'\n  },\n')
+    # O restante é pequeno: serializa de uma vez e reaproveita sem a chave de abertura
+    rest = {key: value for key, value in config.items() if key != "routes"}
+    f.write(_json_pretty(rest)[2:])
+
+# Unidades de format_file_size, uma a cada potência de 1024
+_SIZE_NAMES = ("B", "KB", "MB", "GB", "TB")
+
+# Faixas de format_datetime: (limite em segundos, divisor, unidade)
+_AGE_RANGES = ((60, 1, "segundos"), (3600, 60, "minutos"), (86400, 3600, "horas"))
+
+def _describe_age(elapsed: float, dt: datetime) -> str:
+    """Texto relativo para `elapsed` segundos; acima de um dia, a data de `dt`"""
+    for limit, divisor, unit in _AGE_RANGES:
+        if elapsed < limit:
+            return f"Há {int(elapsed / divisor)} {unit}"
+    return dt.strftime("%d/%m/%Y %H:%M")
+
+@lru_cache(maxsize=128)
+def _validate_telegram_credentials_cached(api_id: str, api_hash: str) -> bool:
+    """Validação pura de StreamlitUtils.validate_telegram_credentials; cache_clear() ao trocar credenciais"""
+    # Verificar se API_ID é numérico
+    if not str(api_id).isdecimal():
+        return False
+    
+    # Verificar se API_HASH tem formato válido (32 caracteres hex)
+    if not isinstance(api_hash, str) or len(api_hash) != 32:
+        return False
+    
+    # Verificar se é hexadecimal: fromhex varre em C, sem montar um inteiro de 128 bits;
+    # os 16 bytes excluem espaços, que fromhex aceitaria entre os pares
+    try:
+        return len(bytes.fromhex(api_hash)) == 16
+    except ValueError:
+        return False
+
+# Dados de demonstração, montados uma vez; as funções devolvem cópias
+_EXAMPLE_CHATS = (
+    {
+        "id": "@python_br",
+        "name": "Python Brasil",
+        "type": "Canal",
+        "members": 50000,
+        "description": "Comunidade Python do Brasil"
+    },
+    {
+        "id": "123456789",
+        "name": "Grupo Tech News",
+        "type": "Grupo",
+        "members": 1250,
+        "description": "Notícias sobre tecnologia"
+    },
+    {
+        "id": "@datascience_channel",
+        "name": "Data Science Channel",
+        "type": "Canal",
+        "members": 8500,
+        "description": "Conteúdo sobre ciência de dados"
+    },
+    {
+        "id": "987654321",
+        "name": "DevOps Community",
+        "type": "Grupo",
+        "members": 3400,
+        "description": "Comunidade DevOps"
+    }
+)
+
+class RouteCard(NamedTuple):
+    """Card visual de uma rota (use `_asdict()` para serializar)"""
+    source: str
+    destination: str
+    status: str = "ativa"
+    created_at: str = ""
+    last_activity: Optional[str] = None
+    messages_count: int = 0
+
+class BackupStatistics(NamedTuple):
+    """Estatísticas de backup (use `_asdict()` para serializar)"""
+    total_messages: int
+    messages_today: int
+    messages_this_week: int
+    active_chats: int
+    total_storage: str
+    uptime_hours: int
+    success_rate: float
+    errors_count: int
+    last_backup: str
+
+_LOG_MESSAGES = (
+    "Sistema iniciado com sucesso",
+    "Conectado ao Telegram",
+    "Configuração carregada",
+    "Rotas verificadas",
+    "Backup iniciado",
+    "Mensagem processada",
+    "Estado salvo",
+    "Conexão verificada",
+    "Filtros aplicados",
+    "Serviço rodando"
+)
+
+_CONFIG_TEMPLATE = {
+    "routes": {
+        "@meu_canal": "me",
+        "123456789": "backup_group"
+    },
+    "filters": {
+        "media_only": False,
+        "photos": True,
+        "videos": True,
+        "documents": False,
+        "text_messages": True
+    },
+    "settings": {
+        "max_workers": 4,
+        "batch_size": 100,
+        "retry_delay": 5,
+        "timeout": 30
+    }
+}
 
 class StreamlitUtils:
     """Classe utilitária para funções da interface Streamlit"""
@@ -22,13 +179,11 @@ class StreamlitUtils:
         if size_bytes == 0:
             return "0 B"
         
-        size_names = ["B", "KB", "MB", "GB", "TB"]
+        # A unidade sai direto do número de bits: cada 10 bits é um fator de 1024
         i = 0
-        while size_bytes >= 1024 and i < len(size_names) - 1:
-            size_bytes /= 1024.0
-            i += 1
-        
-        return f"{size_bytes:.1f} {size_names[i]}"
+        if size_bytes >= 1024:
+            i = min((int(size_bytes).bit_length() - 1) // 10, len(_SIZE_NAMES) - 1)
+        return f"{size_bytes / (1 << (i * 10)):.1f} {_SIZE_NAMES[i]}"
     
     @staticmethod
     def format_datetime(dt: datetime) -> str:
@@ -39,187 +194,99 @@ class StreamlitUtils:
         # Garantir que dt tenha timezone (se for naive, assume UTC ou local de acordo com lógica do Telethon)
         # Telethon retorna aware datetimes (UTC). datetime.now() é naive por padrão.
         # Solução: converter tudo para UTC aware.
-
-        from datetime import timezone
-
         now = datetime.now(timezone.utc)
 
         if dt.tzinfo is None:
             # Se dt é naive, assume UTC para comparação segura
             dt = dt.replace(tzinfo=timezone.utc)
 
-        diff = now - dt
-        
-        if diff.total_seconds() < 60:
-            return f"Há {int(diff.total_seconds())} segundos"
-        elif diff.total_seconds() < 3600:
-            return f"Há {int(diff.total_seconds() / 60)} minutos"
-        elif diff.total_seconds() < 86400:
-            return f"Há {int(diff.total_seconds() / 3600)} horas"
-        else:
-            return dt.strftime("%d/%m/%Y %H:%M")
+        return _describe_age((now - dt).total_seconds(), dt)
     
     @staticmethod
     def get_status_color(status: str) -> str:
         """Retorna cor do status para indicadores visuais"""
-        status_colors = {
-            "online": "#10b981",      # Verde
-            "offline": "#ef4444",     # Vermelho
-            "warning": "#f59e0b",     # Amarelo
-            "info": "#3b82f6",        # Azul
-            "success": "#10b981",     # Verde
-            "error": "#ef4444",       # Vermelho
-            "pending": "#6b7280",     # Cinza
-            "processing": "#8b5cf6"   # Roxo
-        }
-        return status_colors.get(status.lower(), "#6b7280")
+        # Os chamadores quase sempre já passam minúsculas; lower() só no fallback
+        color = STATUS_COLORS.get(status)
+        if color is None:
+            color = STATUS_COLORS.get(status.lower(), "#6b7280")
+        return color
     
     @staticmethod
-    def create_route_card(source: str, destination: str, status: str = "ativa") -> Dict[str, Any]:
+    def create_route_card(source: str, destination: str, status: str = "ativa") -> RouteCard:
         """Cria card visual para uma rota de backup"""
-        return {
-            "source": source,
-            "destination": destination,
-            "status": status,
-            "created_at": datetime.now().isoformat(),
-            "last_activity": None,
-            "messages_count": 0
-        }
+        return RouteCard(source, destination, status, datetime.now().isoformat())
     
     @staticmethod
     def load_example_chats() -> List[Dict[str, Any]]:
         """Carrega exemplos de chats para demonstração"""
-        return [
-            {
-                "id": "@python_br",
-                "name": "Python Brasil",
-                "type": "Canal",
-                "members": 50000,
-                "description": "Comunidade Python do Brasil"
-            },
-            {
-                "id": "123456789",
-                "name": "Grupo Tech News",
-                "type": "Grupo",
-                "members": 1250,
-                "description": "Notícias sobre tecnologia"
-            },
-            {
-                "id": "@datascience_channel",
-                "name": "Data Science Channel",
-                "type": "Canal",
-                "members": 8500,
-                "description": "Conteúdo sobre ciência de dados"
-            },
-            {
-                "id": "987654321",
-                "name": "DevOps Community",
-                "type": "Grupo",
-                "members": 3400,
-                "description": "Comunidade DevOps"
-            }
-        ]
+        return [dict(chat) for chat in _EXAMPLE_CHATS]
     
     @staticmethod
-    def create_backup_statistics() -> Dict[str, Any]:
+    def create_backup_statistics() -> BackupStatistics:
         """Cria estatísticas de exemplo para demonstração"""
-        return {
-            "total_messages": 15420,
-            "messages_today": 127,
-            "messages_this_week": 892,
-            "active_chats": 8,
-            "total_storage": "2.3 GB",
-            "uptime_hours": 168,
-            "success_rate": 99.7,
-            "errors_count": 45,
-            "last_backup": datetime.now().isoformat()
-        }
+        return BackupStatistics(
+            total_messages=15420,
+            messages_today=127,
+            messages_this_week=892,
+            active_chats=8,
+            total_storage="2.3 GB",
+            uptime_hours=168,
+            success_rate=99.7,
+            errors_count=45,
+            last_backup=datetime.now().isoformat(),
+        )
     
     @staticmethod
     def generate_log_messages(count: int = 10) -> List[str]:
         """Gera mensagens de log para demonstração"""
-        logs = []
-        base_time = datetime.now()
+        import numpy as np
         
-        messages = [
-            "Sistema iniciado com sucesso",
-            "Conectado ao Telegram",
-            "Configuração carregada",
-            "Rotas verificadas",
-            "Backup iniciado",
-            "Mensagem processada",
-            "Estado salvo",
-            "Conexão verificada",
-            "Filtros aplicados",
-            "Serviço rodando"
-        ]
-        
-        for i in range(count):
-            time_offset = i * 30  # 30 segundos entre logs
-            log_time = base_time - timedelta(seconds=time_offset)
-            message = messages[i % len(messages)]
-            logs.append(f"{log_time.strftime('%Y-%m-%d %H:%M:%S')} - {message}")
+        # Horários calculados de uma vez no NumPy, 30 segundos entre logs
+        offsets = np.arange(count, dtype="int64") * np.timedelta64(30, "s")
+        times = (np.datetime64(datetime.now(), "s") - offsets).astype("datetime64[s]")
+        stamps = np.datetime_as_string(times, unit="s")
         
-        return logs
+        return [
+            f"{stamp.replace('T', ' ')} - {_LOG_MESSAGES[i % len(_LOG_MESSAGES)]}"
+            for i, stamp in enumerate(stamps.tolist())
+        ]
     
     @staticmethod
     def validate_telegram_credentials(api_id: str, api_hash: str) -> bool:
-        """Valida formato das credenciais do Telegram"""
+        """Valida formato das credenciais do Telegram (memoizado; rerodar com o mesmo par é O(1))"""
         try:
-            # Verificar se API_ID é numérico
-            int(api_id)
-            
-            # Verificar se API_HASH tem formato válido (32 caracteres hex)
-            if len(api_hash) != 32:
-                return False
-            
-            # Verificar se é hexadecimal
-            int(api_hash, 16)
-            
-            return True
-        except (ValueError, TypeError):
+            return _validate_telegram_credentials_cached(api_id, api_hash)
+        except TypeError:
+            # Argumentos não hasheáveis não cabem no cache e também não são credenciais válidas
             return False
     
     @staticmethod
     def create_config_template() -> Dict[str, Any]:
         """Cria template de configuração"""
-        return {
-            "routes": {
-                "@meu_canal": "me",
-                "123456789": "backup_group"
-            },
-            "filters": {
-                "media_only": False,
-                "photos": True,
-                "videos": True,
-                "documents": False,
-                "text_messages": True
-            },
-            "settings": {
-                "max_workers": 4,
-                "batch_size": 100,
-                "retry_delay": 5,
-                "timeout": 30
-            }
-        }
+        return copy.deepcopy(_CONFIG_TEMPLATE)
     
     @staticmethod
-    def export_configuration(manager: TelegramBackupManager, filename: str) -> bool:
+    def export_configuration(manager: "TelegramBackupManager", filename: str) -> bool:
         """Exporta configuração para arquivo"""
         try:
             config = {
                 "routes": manager.config.routes,
-                "filters": manager.config.filters,
-                "settings": manager.config.settings,
+                "filters": manager.config.filters.model_dump(),
+                "settings": manager.config.settings.model_dump(),
                 "export_date": datetime.now().isoformat(),
                 "version": "2.0.0"
             }
             
-            with open(filename, 'w', encoding='utf-8') as f:
-                json.dump(config, f, ensure_ascii=False, indent=2)
+            with open(filename, 'wb', buffering=EXPORT_BUFFER_SIZE) as f:
+                if len(config["routes"]) < EXPORT_STREAM_MIN_ROUTES:
+                    # Codifica tudo de uma vez e grava com um único write (json.dump escreve em pedaços)
+                    f.write(_json_pretty(config))
+                else:
+                    _write_streamed_export(f, config)
             
             return True
         except Exception as e:
+            import streamlit as st
             st.error(f"Erro ao exportar configuração: {e}")
             return False
     
@@ -227,42 +294,47 @@ class StreamlitUtils:
     def import_configuration(filename: str) -> Optional[Dict[str, Any]]:
         """Importa configuração de arquivo"""
         try:
-            with open(filename, 'r', encoding='utf-8') as f:
-                config = json.load(f)
+            with open(filename, 'rb') as f:
+                config = json_loads(f.read())
             
             # Validar estrutura básica
             required_keys = ["routes", "filters"]
             if not all(key in config for key in required_keys):
+                import streamlit as st
                 st.error("Arquivo de configuração inválido")
                 return None
             
             return config
         except Exception as e:
+            import streamlit as st
             st.error(f"Erro ao importar configuração: {e}")
             return None
 
 # Funções auxiliares para cache e performance
-@st.cache_data(ttl=60)
-def get_system_info():
-    """Obtém informações do sistema (com cache)"""
+@lru_cache(maxsize=None)
+def _static_system_info():
+    """Parte fixa das informações do sistema (não muda durante o processo)"""
     return {
         "python_version": f"{os.sys.version_info.major}.{os.sys.version_info.minor}.{os.sys.version_info.micro}",
         "platform": os.sys.platform,
-        "current_time": datetime.now().isoformat(),
         "working_directory": os.getcwd()
     }
 
-@st.cache_data(ttl=30)
-def load_configuration_summary():
-    """Carrega resumo da configuração (com cache)"""
+def get_system_info():
+    """Obtém informações do sistema (parte fixa em cache, horário sempre atual)"""
+    return {**_static_system_info(), "current_time": datetime.now().isoformat()}
+
+@lru_cache(maxsize=1)
+def _configuration_summary(file_key: Optional[Tuple[int, int]]):
+    """Resumo de config.json; `file_key` (mtime_ns, tamanho) invalida o cache quando o arquivo muda"""
     try:
-        if os.path.exists("config.json"):
-            with open("config.json", 'r', encoding='utf-8') as f:
-                config = json.load(f)
+        if file_key is not None:
+            with open("config.json", 'rb') as f:
+                config = json_loads(f.read())
             
             return {
                 "routes_count": len(config.get("routes", {})),
-                "filters_active": sum(1 for v in config.get("filters", {}).values() if v),
+                "filters_active": sum(map(bool, config.get("filters", {}).values())),
                 "has_config": True
             }
         else:
@@ -278,33 +350,41 @@ def load_configuration_summary():
             "has_config": False
         }
 
+def load_configuration_summary():
+    """Carrega resumo da configuração (relido só quando config.json muda)"""
+    # Um os.stat por chamada; o tamanho pega regravações dentro da resolução do mtime
+    try:
+        stat = os.stat("config.json")
+        file_key = (stat.st_mtime_ns, stat.st_size)
+    except OSError:
+        file_key = None
+    # Cópia: o dict em cache é compartilhado entre chamadas
+    return dict(_configuration_summary(file_key))
+
 # Funções de utilidade para Streamlit
+# Templates em uma linha; a mensagem é escapada antes de entrar no HTML
+_SUCCESS_TPL = '<div class="success-message">✅ %s</div>'
+_ERROR_TPL = '<div class="error-message">❌ %s</div>'
+_WARNING_TPL = '<div class="warning-message">⚠️ %s</div>'
+
 def show_success_message(message: str):
     """Mostra mensagem de sucesso com estilo"""
-    st.markdown(f"""
-    <div class="success-message">
-        ✅ {message}
-    </div>
-    """, unsafe_allow_html=True)
+    import streamlit as st
+    st.markdown(_SUCCESS_TPL % html.escape(str(message)), unsafe_allow_html=True)
 
 def show_error_message(message: str):
     """Mostra mensagem de erro com estilo"""
-    st.markdown(f"""
-    <div class="error-message">
-        ❌ {message}
-    </div>
-    """, unsafe_allow_html=True)
+    import streamlit as st
+    st.markdown(_ERROR_TPL % html.escape(str(message)), unsafe_allow_html=True)
 
 def show_warning_message(message: str):
     """Mostra mensagem de aviso com estilo"""
-    st.markdown(f"""
-    <div class="warning-message">
-        ⚠️ {message}
-    </div>
-    """, unsafe_allow_html=True)
+    import streamlit as st
+    st.markdown(_WARNING_TPL % html.escape(str(message)), unsafe_allow_html=True)
 
 def show_info_message(message: str):
     """Mostra mensagem informativa com estilo"""
+    import streamlit as st
     st.info(f"ℹ️ {message}")
 
 # Constantes úteis
@@ -332,6 +412,8 @@ STATUS_COLORS = {
 # Exportar classes e funções
 __all__ = [
     'StreamlitUtils',
+    'RouteCard',
+    'BackupStatistics',
     'get_system_info',
     'load_configuration_summary',
     'show_success_message',